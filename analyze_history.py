@@ -13,37 +13,49 @@ Usage:
 import argparse
 from datetime import datetime, timedelta
 import sys
-import matplotlib.pyplot as plt
+import numpy as np
+import pandas as pd
 
 from snapshot import SurfaceHistory
-from visualizations import (plot_surface_comparison, plot_difference_surface,
-                           plot_metrics_timeseries, plot_volatility_surface,
-                           plot_volatility_smile, plot_term_structure,
-                           plot_heatmap, plot_greeks_surface_3d)
 import os
 
 
+def _select_backend(save_plots):
+    """
+    Choose the matplotlib backend before pyplot is first imported.
+
+    Plotting (and therefore matplotlib) is only imported by the commands that
+    draw something, so --list stays fast. When plots are only written to disk
+    the headless Agg backend skips GUI initialization entirely.
+    """
+    if save_plots:
+        import matplotlib
+        matplotlib.use('Agg')
+
+
 def list_snapshots(history_dir='vol_surface_history', currency=None):
     """List all available snapshots"""
     history = SurfaceHistory(storage_dir=history_dir)
-    snapshots = history.load_all_snapshots(currency=currency)
+    manifest = history.get_manifest(currency=currency)
 
-    if not snapshots:
+    if manifest.empty:
         print("No snapshots found")
         return
 
-    print(f"\nFound {len(snapshots)} snapshot(s):")
+    table = pd.DataFrame({
+        'Date': manifest['timestamp'].dt.strftime('%Y-%m-%d %H:%M:%S'),
+        'Currency': manifest['currency'],
+        'Price': manifest['underlying_price'],
+        'DVOL': manifest['dvol'],
+    })
+    formatters = {
+        'Price': '${:,.2f}'.format,
+        'DVOL': lambda x: f"{x:.2f}%" if pd.notna(x) and x else "N/A",
+    }
+
+    print(f"\nFound {len(manifest)} snapshot(s):")
     print("-" * 80)
-    print(f"{'Date':<20} {'Currency':<10} {'Price':<15} {'DVOL':<10}")
-    print("-" * 80)
-
-    for snap in snapshots:
-        dvol_str = f"{snap.dvol:.2f}%" if snap.dvol else "N/A"
-        print(f"{snap.timestamp.strftime('%Y-%m-%d %H:%M:%S'):<20} "
-              f"{snap.currency:<10} "
-              f"${snap.underlying_price:>12,.2f} "
-              f"{dvol_str:<10}")
-
+    print(table.to_string(index=False, formatters=formatters, na_rep="N/A", col_space=12))
     print("-" * 80)
 
 
@@ -51,9 +63,9 @@ def compare_snapshots(date1_str, date2_str, history_dir='vol_surface_history',
                      currency=None, save_plots=False):
     """Compare two snapshots"""
     history = SurfaceHistory(storage_dir=history_dir)
-    snapshots = history.load_all_snapshots(currency=currency)
+    manifest = history.get_manifest(currency=currency)
 
-    if len(snapshots) < 2:
+    if len(manifest) < 2:
         print("Need at least 2 snapshots for comparison")
         return
 
@@ -65,9 +77,9 @@ def compare_snapshots(date1_str, date2_str, history_dir='vol_surface_history',
         print(f"Error parsing dates. Use format: YYYY-MM-DD or YYYY-MM-DD HH:MM:SS")
         return
 
-    # Find closest snapshots
-    snap1 = history.get_snapshot_by_date(date1)
-    snap2 = history.get_snapshot_by_date(date2)
+    # Find closest snapshots (only these two are read from disk)
+    snap1 = history.get_snapshot_by_date(date1, currency=currency)
+    snap2 = history.get_snapshot_by_date(date2, currency=currency)
 
     if not snap1 or not snap2:
         print("Could not find snapshots for the specified dates")
@@ -80,6 +92,9 @@ def compare_snapshots(date1_str, date2_str, history_dir='vol_surface_history',
           f"({((snap2.underlying_price/snap1.underlying_price - 1) * 100):+.2f}%)")
 
     # Plot comparison
+    _select_backend(save_plots)
+    from visualizations import plot_surface_comparison, plot_difference_surface
+
     save_path1 = 'comparison.png' if save_plots else None
     save_path2 = 'difference.png' if save_plots else None
 
@@ -94,25 +109,28 @@ def compare_snapshots(date1_str, date2_str, history_dir='vol_surface_history',
 def plot_timeseries(history_dir='vol_surface_history', currency=None, save_plots=False):
     """Plot time series of metrics"""
     history = SurfaceHistory(storage_dir=history_dir)
-    snapshots = history.load_all_snapshots(currency=currency)
+    manifest = history.get_manifest(currency=currency)
 
-    if len(snapshots) < 2:
+    if len(manifest) < 2:
         print("Need at least 2 snapshots for time series analysis")
         return
 
-    print(f"\nAnalyzing {len(snapshots)} snapshots...")
+    print(f"\nAnalyzing {len(manifest)} snapshots...")
+
+    _select_backend(save_plots)
+    from visualizations import plot_metrics_timeseries
 
     save_path = 'timeseries.png' if save_plots else None
-    plot_metrics_timeseries(history, save_path=save_path)
+    plot_metrics_timeseries(history, save_path=save_path, currency=currency)
 
 
 def visualize_snapshot(date_str, history_dir='vol_surface_history',
                       currency=None, save_plots=False, plots_dir='plots'):
     """Display all standard plots for a single historical snapshot"""
     history = SurfaceHistory(storage_dir=history_dir)
-    snapshots = history.load_all_snapshots(currency=currency)
+    manifest = history.get_manifest(currency=currency)
 
-    if not snapshots:
+    if manifest.empty:
         print("No snapshots found")
         return
 
@@ -124,7 +142,7 @@ def visualize_snapshot(date_str, history_dir='vol_surface_history',
         return
 
     # Find closest snapshot
-    snapshot = history.get_snapshot_by_date(target_date)
+    snapshot = history.get_snapshot_by_date(target_date, currency=currency)
 
     if not snapshot:
         print(f"Could not find snapshot for date {date_str}")
@@ -139,7 +157,6 @@ def visualize_snapshot(date_str, history_dir='vol_surface_history',
     # Print metrics
     if snapshot.metrics:
         print("\nMetrics:")
-        import numpy as np
         for key, value in snapshot.metrics.items():
             if value is not None and not (isinstance(value, float) and np.isnan(value)):
                 if isinstance(value, float):
@@ -147,6 +164,11 @@ def visualize_snapshot(date_str, history_dir='vol_surface_history',
                 else:
                     print(f"  {key}: {value}")
 
+    _select_backend(save_plots)
+    from visualizations import (plot_volatility_surface, plot_heatmap,
+                                plot_volatility_smile, plot_term_structure,
+                                plot_greeks_surface_3d)
+
     # Setup save directory if needed
     save_dir = None
     if save_plots:
@@ -190,27 +212,21 @@ def visualize_snapshot(date_str, history_dir='vol_surface_history',
         save_path = os.path.join(save_dir, f"{snapshot.currency}_term_structure.png") if save_dir else None
         plot_term_structure(df, save_path=save_path)
 
-        # Plot Greeks if available
-        if 'delta' in df.columns and df['delta'].notna().any():
-            save_path = os.path.join(save_dir, f"{snapshot.currency}_delta_surface_3d.png") if save_dir else None
-            plot_greeks_surface_3d(df, snapshot.underlying_price, 'delta', save_path=save_path)
-
-        if 'gamma' in df.columns and df['gamma'].notna().any():
-            save_path = os.path.join(save_dir, f"{snapshot.currency}_gamma_surface_3d.png") if save_dir else None
-            plot_greeks_surface_3d(df, snapshot.underlying_price, 'gamma', save_path=save_path)
-
-        if 'vega' in df.columns and df['vega'].notna().any():
-            save_path = os.path.join(save_dir, f"{snapshot.currency}_vega_surface_3d.png") if save_dir else None
-            plot_greeks_surface_3d(df, snapshot.underlying_price, 'vega', save_path=save_path)
+        # Plot Greeks if available (calculated from the fitted surface, bs_*)
+        for greek in ['delta', 'gamma', 'vega']:
+            greek_col = f'bs_{greek}'
+            if greek_col in df.columns and df[greek_col].notna().any():
+                save_path = os.path.join(save_dir, f"{snapshot.currency}_{greek}_surface_3d.png") if save_dir else None
+                plot_greeks_surface_3d(df, snapshot.underlying_price, greek_col, save_path=save_path)
 
 
 def event_study(event_date_str, days_before=5, days_after=5,
                history_dir='vol_surface_history', currency=None, save_plots=False):
     """Analyze surface changes around a specific event"""
     history = SurfaceHistory(storage_dir=history_dir)
-    snapshots = history.load_all_snapshots(currency=currency)
+    manifest = history.get_manifest(currency=currency)
 
-    if len(snapshots) < 2:
+    if len(manifest) < 2:
         print("Need at least 2 snapshots for event study")
         return
 
@@ -225,23 +241,22 @@ def event_study(event_date_str, days_before=5, days_after=5,
     start_date = event_date - timedelta(days=days_before)
     end_date = event_date + timedelta(days=days_after)
 
-    event_snapshots = [s for s in snapshots
-                      if start_date <= s.timestamp <= end_date]
+    window = history.snapshots_in_range(start_date, end_date, currency=currency)
 
-    if len(event_snapshots) < 2:
+    if len(window) < 2:
         print(f"Not enough snapshots around {event_date}")
         return
 
-    # Find closest before and after
-    before = max([s for s in event_snapshots if s.timestamp <= event_date],
-                key=lambda x: x.timestamp, default=None)
-    after = min([s for s in event_snapshots if s.timestamp > event_date],
-               key=lambda x: x.timestamp, default=None)
+    # Find closest before and after: the window rows are already sorted by time
+    split = window['timestamp'].searchsorted(event_date, side='right')
 
-    if not before or not after:
+    if split == 0 or split == len(window):
         print(f"Could not find snapshots both before and after {event_date}")
         return
 
+    before = history.load_snapshot(window['path'].iloc[split - 1])
+    after = history.load_snapshot(window['path'].iloc[split])
+
     print(f"\nEvent Study: {event_date.strftime('%Y-%m-%d')}")
     print(f"Before: {before.timestamp.strftime('%Y-%m-%d %H:%M')}")
     print(f"After: {after.timestamp.strftime('%Y-%m-%d %H:%M')}")
@@ -250,17 +265,17 @@ def event_study(event_date_str, days_before=5, days_after=5,
 
     # Compare metrics
     print("\nMetric Changes:")
-    for key in before.metrics:
-        if key in after.metrics:
-            val_before = before.metrics[key]
-            val_after = after.metrics[key]
-            if val_before is not None and val_after is not None:
-                import numpy as np
-                if not np.isnan(val_before) and not np.isnan(val_after):
-                    change = (val_after - val_before) * 100
-                    print(f"  {key}: {val_before*100:.2f}% → {val_after*100:.2f}% ({change:+.2f}pp)")
+    metrics_before = pd.Series(before.metrics, dtype=float)
+    metrics_after = pd.Series(after.metrics, dtype=float)
+    common = metrics_before.index.intersection(metrics_after.index)
+    changes = (metrics_after[common] - metrics_before[common]).dropna() * 100
+    for key, change in changes.items():
+        print(f"  {key}: {metrics_before[key]*100:.2f}% → {metrics_after[key]*100:.2f}% ({change:+.2f}pp)")
 
     # Create visualizations
+    _select_backend(save_plots)
+    from visualizations import plot_surface_comparison, plot_difference_surface
+
     save_path1 = 'event_comparison.png' if save_plots else None
     save_path2 = 'event_difference.png' if save_plots else None
 
@@ -6,24 +6,29 @@ Usage:
     streamlit run app.py
 """
 
+import matplotlib
+matplotlib.use('Agg')  # Headless: figures are rendered to PNG, no GUI backend needed
+import matplotlib.pyplot as plt
 import streamlit as st
 import pandas as pd
 import numpy as np
 from datetime import datetime
 import sys
 import os
+import io
+import gc
 from pathlib import Path
 
 # Import our modules
 from deribit_api import get_index_price, get_dvol_index, get_all_options_data, get_option_iv_data
-from data_processing import clean_iv_data, separate_by_type, summarize_data
+from data_processing import clean_iv_data, select_analysis_columns, separate_by_type, summarize_data
 from surface_builder import create_simple_surface, create_rbf_surface, create_svi_surface
 from metrics import calculate_surface_metrics
-from snapshot import SurfaceSnapshot, SurfaceHistory
+from snapshot import SurfaceSnapshot, SurfaceHistory, slim_raw_options, RAW_OPTION_COLUMNS
 from visualizations import (plot_volatility_surface, plot_volatility_smile,
                            plot_term_structure, plot_heatmap, plot_greeks_surface_3d,
                            plot_surface_comparison, plot_difference_surface,
-                           plot_metrics_timeseries)
+                           plot_metrics_timeseries, METRICS_PLOT_COLUMNS)
 from greeks import calculate_greeks_from_surface
 
 # Page config
@@ -34,6 +39,318 @@ st.set_page_config(
     initial_sidebar_state="expanded"
 )
 
+
+@st.cache_resource
+def get_history():
+    """Shared SurfaceHistory instance, reused across reruns"""
+    return SurfaceHistory()
+
+
+@st.cache_data(ttl=60, show_spinner=False)
+def fetch_index_price(currency):
+    """Current index price, cached for a minute"""
+    return get_index_price(currency)
+
+
+@st.cache_data(ttl=60, show_spinner=False)
+def fetch_dvol_index(currency):
+    """Current DVOL, cached for a minute"""
+    return get_dvol_index(currency)
+
+
+@st.cache_data(ttl=60, show_spinner=False)
+def fetch_option_chain(currency, underlying_price):
+    """Active options with their IVs, cached for a minute"""
+    instruments = get_all_options_data(currency)
+    return get_option_iv_data(instruments, underlying_price)
+
+
+@st.cache_data(max_entries=10, show_spinner=False)
+def build_surface(calls, method):
+    """Fit the IV surface; returns (log_m_mesh, tte_mesh, iv_surf, svi_params)"""
+    if method == 'simple':
+        return (*create_simple_surface(calls, method='cubic'), None)
+    elif method == 'rbf':
+        return (*create_rbf_surface(calls), None)
+    elif method == 'svi':
+        return create_svi_surface(calls)
+
+
+@st.cache_data(max_entries=10, show_spinner=False)
+def compute_greeks(df, log_m_mesh, tte_mesh, iv_surf, underlying_price):
+    """Black-Scholes Greeks from the smoothed surface"""
+    return calculate_greeks_from_surface(
+        df, log_m_mesh, tte_mesh, iv_surf,
+        underlying_price, risk_free_rate=0.0
+    )
+
+
+def show_figure(fig):
+    """Render a figure as a compact PNG (tight bbox, 90 dpi) to cut the bytes sent to the browser"""
+    buf = io.BytesIO()
+    fig.savefig(buf, format='png', bbox_inches='tight', dpi=90)
+    st.image(buf, use_container_width=True)
+    # Drop pyplot's reference so figures don't pile up across reruns; the
+    # surface and heatmap figures kept in session state stay usable
+    plt.close(fig)
+
+
+def find_greek_columns(df):
+    """
+    Greek name -> calculated Greek column (bs_*) to plot, keeping only columns
+    that hold any values.
+    """
+    greek_mapping = {'Delta': 'bs_delta', 'Gamma': 'bs_gamma', 'Vega': 'bs_vega'}
+    present = [col for col in greek_mapping.values() if col in df.columns]
+    has_data = df[present].notna().any()  # one scan over the candidate columns
+    return {name: col for name, col in greek_mapping.items() if col in present and has_data[col]}
+
+
+@st.cache_data(hash_funcs={SurfaceSnapshot: lambda s: s.timestamp.isoformat() + s.currency})
+def compare_metrics(snap1, snap2):
+    """Before/after/change table for the metrics two snapshots share"""
+    metrics1 = pd.Series(snap1.metrics, dtype=float)
+    metrics2 = pd.Series(snap2.metrics, dtype=float)
+    common = metrics1.index.intersection(metrics2.index)
+    changes = (metrics2[common] - metrics1[common]).dropna()
+
+    return pd.DataFrame({
+        'Metric': changes.index,
+        'Before': (metrics1[changes.index] * 100).map('{:.2f}%'.format).values,
+        'After': (metrics2[changes.index] * 100).map('{:.2f}%'.format).values,
+        'Change': (changes * 100).map('{:+.2f}pp'.format).values
+    })
+
+
+def get_manifest_mtime(history):
+    """Modification time of the snapshot manifest, used as a cache key"""
+    path = history.manifest_path
+    return path.stat().st_mtime if path.exists() else 0.0
+
+
+@st.cache_data
+def load_manifest(currency, manifest_mtime):
+    """Snapshot manifest rows, reloaded only when the manifest changes"""
+    return SurfaceHistory().get_manifest(currency=currency)
+
+
+@st.cache_data
+def build_labels(currency, manifest_mtime):
+    """Selectbox labels for every snapshot in the manifest"""
+    manifest = load_manifest(currency, manifest_mtime)
+    return [f"{ts:%Y-%m-%d %H:%M} ({cur})"
+            for ts, cur in zip(manifest['timestamp'], manifest['currency'])]
+
+
+@st.cache_resource(max_entries=32)
+def load_snapshot(path, manifest_mtime, with_raw=False):
+    """
+    Shared snapshot for a manifest path, loaded once per process. The surface is
+    memory-mapped and, with `with_raw`, the raw option columns the plots read
+    are loaded here too; views only ever read the shared object.
+    """
+    history = get_history()
+    snapshot = history.load_snapshot(path)
+    snapshot.ensure_loaded()
+    if with_raw:
+        history.load_raw_data(snapshot, columns=RAW_OPTION_COLUMNS)
+    return snapshot
+
+
+@st.cache_data
+def get_metrics_timeseries(history_dir, currency, manifest_mtime, bins=None, columns=None):
+    """Metrics time series from the manifest, rebuilt only when the manifest changes"""
+    return SurfaceHistory(storage_dir=history_dir).get_metrics_timeseries(
+        currency=currency, bins=bins, columns=columns)
+
+
+# Historical views run as fragments: changing a snapshot selector or toggle
+# reruns only that view, not the sidebar, manifest load and the rest of the page
+@st.fragment
+def visualize_snapshot_view(manifest, currency_arg, manifest_mtime):
+    """Summary, metrics and plots for one selected snapshot"""
+    st.header("🔍 Visualize Historical Snapshot")
+
+    # Select snapshot
+    snapshot_labels = build_labels(currency_arg, manifest_mtime)
+    snap_idx = st.selectbox("Select Snapshot", range(len(manifest)),
+                            format_func=lambda x: snapshot_labels[x])
+    snapshot = load_snapshot(manifest.at[snap_idx, 'path'], manifest_mtime, with_raw=True)
+
+    # Display snapshot info
+    st.subheader("📊 Snapshot Summary")
+    col1, col2, col3, col4 = st.columns(4)
+
+    with col1:
+        st.metric("Timestamp", snapshot.timestamp.strftime('%Y-%m-%d %H:%M'))
+    with col2:
+        st.metric("Currency", snapshot.currency)
+    with col3:
+        st.metric("Price", f"${snapshot.underlying_price:,.2f}")
+    with col4:
+        if snapshot.dvol:
+            st.metric("DVOL", f"{snapshot.dvol:.2f}%")
+        else:
+            st.metric("DVOL", "N/A")
+
+    # Show metrics if available
+    if snapshot.metrics:
+        st.subheader("🔑 Key Metrics")
+        col1, col2 = st.columns(2)
+
+        with col1:
+            st.markdown("**ATM Implied Volatility**")
+            atm_data = []
+            for tenor in [7, 30, 60, 90, 180]:
+                key = f'atm_iv_{tenor}d'
+                if key in snapshot.metrics and not pd.isna(snapshot.metrics[key]):
+                    atm_data.append({
+                        'Tenor': f'{tenor}d',
+                        'IV (%)': f"{snapshot.metrics[key]*100:.2f}"
+                    })
+            if atm_data:
+                st.dataframe(pd.DataFrame(atm_data), hide_index=True, use_container_width=True)
+
+        with col2:
+            st.markdown("**Other Metrics**")
+            other_metrics = []
+            if 'skew_25d' in snapshot.metrics and not pd.isna(snapshot.metrics['skew_25d']):
+                other_metrics.append({'Metric': '25-Delta Skew', 'Value': f"{snapshot.metrics['skew_25d']*100:.2f}pp"})
+            if 'term_structure_slope' in snapshot.metrics and not pd.isna(snapshot.metrics['term_structure_slope']):
+                other_metrics.append({'Metric': 'Term Structure Slope', 'Value': f"{snapshot.metrics['term_structure_slope']*100:.2f}pp"})
+            if 'iv_std' in snapshot.metrics:
+                other_metrics.append({'Metric': 'IV Std Dev', 'Value': f"{snapshot.metrics['iv_std']*100:.2f}pp"})
+            if other_metrics:
+                st.dataframe(pd.DataFrame(other_metrics), hide_index=True, use_container_width=True)
+
+    # Visualizations
+    st.header("📈 Volatility Surface Visualizations")
+
+    # 3D Surface
+    if snapshot.surface_data:
+        st.subheader(f"{snapshot.currency} Implied Volatility Surface")
+        log_m_mesh, tte_mesh, iv_surf = snapshot.surface_data
+        fig, _ = plot_volatility_surface(
+            log_m_mesh, tte_mesh, iv_surf,
+            snapshot.underlying_price,
+            f'{snapshot.currency} Implied Volatility Surface - {snapshot.timestamp.strftime("%Y-%m-%d %H:%M")}'
+        )
+        show_figure(fig)
+
+        # Heatmap
+        st.subheader("Volatility Heatmap")
+        fig, _ = plot_heatmap(log_m_mesh, tte_mesh, iv_surf, snapshot.underlying_price)
+        show_figure(fig)
+
+    # Smile and Term Structure if raw data available
+    if snapshot.raw_options is not None:
+        col1, col2 = st.columns(2)
+
+        with col1:
+            st.subheader("Volatility Smile")
+            fig, _ = plot_volatility_smile(snapshot.raw_options)
+            show_figure(fig)
+
+        with col2:
+            st.subheader("Term Structure")
+            fig, _ = plot_term_structure(snapshot.raw_options)
+            show_figure(fig)
+
+        # Greeks if available - calculated from the fitted surface (bs_*)
+        df = snapshot.raw_options
+        greek_mapping = find_greek_columns(df)
+        available_greeks = list(greek_mapping)
+
+        if available_greeks:
+            st.header("🎯 Greeks Surfaces")
+            if any('bs_' in greek_mapping[name] for name in available_greeks):
+                st.info("ℹ️ Greeks calculated from smoothed Black-Scholes model using interpolated IV surface")
+
+            greek_tabs = st.tabs(available_greeks)
+
+            for idx, greek_name in enumerate(available_greeks):
+                with greek_tabs[idx]:
+                    greek_col = greek_mapping[greek_name]
+                    fig, _ = plot_greeks_surface_3d(df, snapshot.underlying_price, greek=greek_col)
+                    show_figure(fig)
+    else:
+        st.info("ℹ️ Raw options data not available. Only surface-based plots are shown. To see smile, term structure, and Greeks, save snapshots with 'Save Raw Data' enabled.")
+
+
+@st.fragment
+def compare_surfaces_view(manifest, currency_arg, manifest_mtime):
+    """Side-by-side surfaces, difference surface and metric changes for two snapshots"""
+    st.header("🔄 Surface Comparison")
+
+    if len(manifest) < 2:
+        st.warning("Need at least 2 snapshots for comparison")
+        return
+
+    col1, col2 = st.columns(2)
+
+    snapshot_labels = build_labels(currency_arg, manifest_mtime)
+
+    with col1:
+        snap1_idx = st.selectbox("Select First Snapshot", range(len(manifest)),
+                                 format_func=lambda x: snapshot_labels[x])
+
+    with col2:
+        snap2_idx = st.selectbox("Select Second Snapshot", range(len(manifest)),
+                                 index=min(1, len(manifest)-1),
+                                 format_func=lambda x: snapshot_labels[x])
+
+    snap1 = load_snapshot(manifest.at[snap1_idx, 'path'], manifest_mtime)
+    snap2 = load_snapshot(manifest.at[snap2_idx, 'path'], manifest_mtime)
+
+    # Price change
+    price_change = ((snap2.underlying_price / snap1.underlying_price) - 1) * 100
+    st.metric(
+        "Price Change",
+        f"${snap2.underlying_price:,.2f}",
+        f"{price_change:+.2f}%",
+        delta_color="normal"
+    )
+
+    # Comparison visualization
+    st.subheader("Surface Comparison")
+    fig = plot_surface_comparison(snap1, snap2,
+                                  title1=snap1.timestamp.strftime('%Y-%m-%d'),
+                                  title2=snap2.timestamp.strftime('%Y-%m-%d'))
+    show_figure(fig)
+
+    # Difference surface
+    st.subheader("Surface Difference (IV Change)")
+    fig = plot_difference_surface(snap1, snap2)
+    show_figure(fig)
+
+    # Metrics comparison
+    st.subheader("Metrics Comparison")
+    metrics_comp = compare_metrics(snap1, snap2)
+
+    if not metrics_comp.empty:
+        st.dataframe(metrics_comp, use_container_width=True, hide_index=True)
+
+
+@st.fragment
+def metrics_timeseries_view(history, manifest, currency_arg, manifest_mtime):
+    """Metrics time series plot with an optional full-resolution table"""
+    st.header("📊 Metrics Time Series")
+
+    if len(manifest) < 2:
+        st.warning("Need at least 2 snapshots for time series analysis")
+        return
+
+    plot_df = get_metrics_timeseries(str(history.storage_dir), currency_arg,
+                                     manifest_mtime, bins=1200, columns=METRICS_PLOT_COLUMNS)
+    fig = plot_metrics_timeseries(plot_df)
+    show_figure(fig)
+
+    # Show data table (full resolution)
+    if st.checkbox("Show Data Table"):
+        ts_df = get_metrics_timeseries(str(history.storage_dir), currency_arg, manifest_mtime)
+        st.dataframe(ts_df, use_container_width=True)
+
+
 # Custom CSS
 st.markdown("""
 <style>
@@ -106,19 +423,18 @@ if mode == "Build Current Surface":
         with st.spinner(f"Fetching {currency} options data..."):
             try:
                 # Get market data
-                underlying_price = get_index_price(currency)
-                dvol = get_dvol_index(currency)
+                underlying_price = fetch_index_price(currency)
+                dvol = fetch_dvol_index(currency)
 
                 st.sidebar.success(f"Current {currency} price: ${underlying_price:,.2f}")
                 if dvol:
                     st.sidebar.info(f"DVOL: {dvol:.2f}%")
 
                 # Get options data
-                instruments = get_all_options_data(currency)
-                df = get_option_iv_data(instruments, underlying_price)
+                df = fetch_option_chain(currency, underlying_price)
 
                 # Clean data
-                df = clean_iv_data(df)
+                df = select_analysis_columns(clean_iv_data(df))
                 calls, puts = separate_by_type(df)
 
                 # Calculate metrics
@@ -127,22 +443,12 @@ if mode == "Build Current Surface":
                 # Build surface
                 st.sidebar.info(f"Building surface using {method.upper()} method...")
 
-                if method == 'simple':
-                    log_m_mesh, tte_mesh, iv_surf = create_simple_surface(calls, method='cubic')
-                    svi_params = None
-                elif method == 'rbf':
-                    log_m_mesh, tte_mesh, iv_surf = create_rbf_surface(calls)
-                    svi_params = None
-                elif method == 'svi':
-                    log_m_mesh, tte_mesh, iv_surf, svi_params = create_svi_surface(calls)
+                log_m_mesh, tte_mesh, iv_surf, svi_params = build_surface(calls, method)
 
                 # Calculate Greeks from smoothed surface
                 st.sidebar.info("Calculating Greeks from smoothed IV surface...")
                 try:
-                    df = calculate_greeks_from_surface(
-                        df, log_m_mesh, tte_mesh, iv_surf,
-                        underlying_price, risk_free_rate=0.0
-                    )
+                    df = compute_greeks(df, log_m_mesh, tte_mesh, iv_surf, underlying_price)
                     st.sidebar.success("Greeks calculated successfully")
                 except Exception as e:
                     st.sidebar.warning(f"Warning: Error calculating Greeks: {e}")
@@ -154,14 +460,14 @@ if mode == "Build Current Surface":
                     underlying_price=underlying_price,
                     dvol=dvol,
                     surface_data=(log_m_mesh, tte_mesh, iv_surf),
-                    raw_options=df,
+                    raw_options=slim_raw_options(df) if save_raw else df,
                     metrics=metrics
                 )
 
                 # Save if requested
                 if save_snapshot:
-                    history = SurfaceHistory()
-                    history.save_snapshot(snapshot, save_raw=save_raw)
+                    get_history().save_snapshot(snapshot, save_raw=save_raw)
+                    load_manifest.clear()
                     st.sidebar.success("Snapshot saved!")
 
                 # Store in session state
@@ -170,6 +476,10 @@ if mode == "Build Current Surface":
                 st.session_state['calls'] = calls
                 st.session_state['puts'] = puts
                 st.session_state['metrics'] = metrics
+                st.session_state['greek_columns'] = find_greek_columns(df)
+
+                # Release the previous build's frames and meshes now
+                gc.collect()
 
             except Exception as e:
                 st.error(f"Error: {e}")
@@ -231,18 +541,26 @@ if mode == "Build Current Surface":
 
         # 3D Surface
         st.subheader(f"{snapshot.currency} Implied Volatility Surface ({method.upper()})")
+        # Figures are kept in the session and updated in place on later reruns.
+        # show_figure has already plt.close()d them; that only drops pyplot's
+        # reference, and Agg figures still draw and save after it, so reusing
+        # them here is intended.
         log_m_mesh, tte_mesh, iv_surf = snapshot.surface_data
-        fig, _ = plot_volatility_surface(
+        fig, ax = plot_volatility_surface(
             log_m_mesh, tte_mesh, iv_surf,
             snapshot.underlying_price,
-            f'{snapshot.currency} Implied Volatility Surface ({method.upper()})'
+            f'{snapshot.currency} Implied Volatility Surface ({method.upper()})',
+            existing=st.session_state.get('surface_fig')
         )
-        st.pyplot(fig)
+        st.session_state['surface_fig'] = (fig, ax)
+        show_figure(fig)
 
         # Heatmap
         st.subheader("Volatility Heatmap")
-        fig, _ = plot_heatmap(log_m_mesh, tte_mesh, iv_surf, snapshot.underlying_price)
-        st.pyplot(fig)
+        fig, ax = plot_heatmap(log_m_mesh, tte_mesh, iv_surf, snapshot.underlying_price,
+                               existing=st.session_state.get('heatmap_fig'))
+        st.session_state['heatmap_fig'] = (fig, ax)
+        show_figure(fig)
 
         # Smile and Term Structure
         col1, col2 = st.columns(2)
@@ -250,21 +568,16 @@ if mode == "Build Current Surface":
         with col1:
             st.subheader("Volatility Smile")
             fig, _ = plot_volatility_smile(calls)
-            st.pyplot(fig)
+            show_figure(fig)
 
         with col2:
             st.subheader("Term Structure")
             fig, _ = plot_term_structure(calls)
-            st.pyplot(fig)
+            show_figure(fig)
 
-        # Greeks if available - prefer calculated Greeks (bs_*) over Deribit data
-        greek_mapping = {
-            'Delta': 'bs_delta' if 'bs_delta' in df.columns else 'delta',
-            'Gamma': 'bs_gamma' if 'bs_gamma' in df.columns else 'gamma',
-            'Vega': 'bs_vega' if 'bs_vega' in df.columns else 'vega'
-        }
-
-        available_greeks = [name for name, col in greek_mapping.items() if col in df.columns and df[col].notna().any()]
+        # Greeks if available - calculated from the fitted surface (bs_*)
+        greek_mapping = st.session_state['greek_columns']
+        available_greeks = list(greek_mapping)
 
         if available_greeks:
             st.header("🎯 Greeks Surfaces")
@@ -277,7 +590,7 @@ if mode == "Build Current Surface":
                 with greek_tabs[idx]:
                     greek_col = greek_mapping[greek_name]
                     fig, _ = plot_greeks_surface_3d(df, snapshot.underlying_price, greek=greek_col)
-                    st.pyplot(fig)
+                    show_figure(fig)
 
 elif mode == "Analyze Historical Data":
     st.sidebar.subheader("Historical Analysis")
@@ -294,12 +607,13 @@ elif mode == "Analyze Historical Data":
         help="Filter snapshots by currency"
     )
 
-    # Load snapshots
-    history = SurfaceHistory()
+    # Load snapshot manifest (surface data is only read for selected snapshots)
+    history = get_history()
     currency_arg = None if currency_filter == "All" else currency_filter
-    snapshots = history.load_all_snapshots(currency=currency_arg)
+    manifest_mtime = get_manifest_mtime(history)
+    manifest = load_manifest(currency_arg, manifest_mtime)
 
-    if not snapshots:
+    if manifest.empty:
         st.warning("No historical snapshots found. Build and save a surface first.")
         st.stop()
 
@@ -308,212 +622,27 @@ elif mode == "Analyze Historical Data":
 
         # Create dataframe
         snapshot_data = []
-        for snap in snapshots:
+        for row in manifest.itertuples(index=False):
             snapshot_data.append({
-                'Timestamp': snap.timestamp.strftime('%Y-%m-%d %H:%M:%S'),
-                'Currency': snap.currency,
-                'Price': f"${snap.underlying_price:,.2f}",
-                'DVOL': f"{snap.dvol:.2f}%" if snap.dvol else "N/A"
+                'Timestamp': row.timestamp.strftime('%Y-%m-%d %H:%M:%S'),
+                'Currency': row.currency,
+                'Price': f"${row.underlying_price:,.2f}",
+                'DVOL': f"{row.dvol:.2f}%" if pd.notna(row.dvol) and row.dvol else "N/A"
             })
 
         df_snapshots = pd.DataFrame(snapshot_data)
         st.dataframe(df_snapshots, use_container_width=True, hide_index=True)
 
-        st.info(f"Total snapshots: {len(snapshots)}")
+        st.info(f"Total snapshots: {len(manifest)}")
 
     elif analysis_type == "Visualize Snapshot":
-        st.header("🔍 Visualize Historical Snapshot")
-
-        # Select snapshot
-        snapshot_labels = [f"{s.timestamp.strftime('%Y-%m-%d %H:%M')} ({s.currency})" for s in snapshots]
-        snap_idx = st.selectbox("Select Snapshot", range(len(snapshots)),
-                                format_func=lambda x: snapshot_labels[x])
-        snapshot = snapshots[snap_idx]
-
-        # Load raw data if available
-        history.load_raw_data(snapshot)
-
-        # Display snapshot info
-        st.subheader("📊 Snapshot Summary")
-        col1, col2, col3, col4 = st.columns(4)
-
-        with col1:
-            st.metric("Timestamp", snapshot.timestamp.strftime('%Y-%m-%d %H:%M'))
-        with col2:
-            st.metric("Currency", snapshot.currency)
-        with col3:
-            st.metric("Price", f"${snapshot.underlying_price:,.2f}")
-        with col4:
-            if snapshot.dvol:
-                st.metric("DVOL", f"{snapshot.dvol:.2f}%")
-            else:
-                st.metric("DVOL", "N/A")
-
-        # Show metrics if available
-        if snapshot.metrics:
-            st.subheader("🔑 Key Metrics")
-            col1, col2 = st.columns(2)
-
-            with col1:
-                st.markdown("**ATM Implied Volatility**")
-                atm_data = []
-                for tenor in [7, 30, 60, 90, 180]:
-                    key = f'atm_iv_{tenor}d'
-                    if key in snapshot.metrics and not pd.isna(snapshot.metrics[key]):
-                        atm_data.append({
-                            'Tenor': f'{tenor}d',
-                            'IV (%)': f"{snapshot.metrics[key]*100:.2f}"
-                        })
-                if atm_data:
-                    st.dataframe(pd.DataFrame(atm_data), hide_index=True, use_container_width=True)
-
-            with col2:
-                st.markdown("**Other Metrics**")
-                other_metrics = []
-                if 'skew_25d' in snapshot.metrics and not pd.isna(snapshot.metrics['skew_25d']):
-                    other_metrics.append({'Metric': '25-Delta Skew', 'Value': f"{snapshot.metrics['skew_25d']*100:.2f}pp"})
-                if 'term_structure_slope' in snapshot.metrics and not pd.isna(snapshot.metrics['term_structure_slope']):
-                    other_metrics.append({'Metric': 'Term Structure Slope', 'Value': f"{snapshot.metrics['term_structure_slope']*100:.2f}pp"})
-                if 'iv_std' in snapshot.metrics:
-                    other_metrics.append({'Metric': 'IV Std Dev', 'Value': f"{snapshot.metrics['iv_std']*100:.2f}pp"})
-                if other_metrics:
-                    st.dataframe(pd.DataFrame(other_metrics), hide_index=True, use_container_width=True)
-
-        # Visualizations
-        st.header("📈 Volatility Surface Visualizations")
-
-        # 3D Surface
-        if snapshot.surface_data:
-            st.subheader(f"{snapshot.currency} Implied Volatility Surface")
-            log_m_mesh, tte_mesh, iv_surf = snapshot.surface_data
-            fig, _ = plot_volatility_surface(
-                log_m_mesh, tte_mesh, iv_surf,
-                snapshot.underlying_price,
-                f'{snapshot.currency} Implied Volatility Surface - {snapshot.timestamp.strftime("%Y-%m-%d %H:%M")}'
-            )
-            st.pyplot(fig)
-
-            # Heatmap
-            st.subheader("Volatility Heatmap")
-            fig, _ = plot_heatmap(log_m_mesh, tte_mesh, iv_surf, snapshot.underlying_price)
-            st.pyplot(fig)
-
-        # Smile and Term Structure if raw data available
-        if snapshot.raw_options is not None:
-            col1, col2 = st.columns(2)
-
-            with col1:
-                st.subheader("Volatility Smile")
-                fig, _ = plot_volatility_smile(snapshot.raw_options)
-                st.pyplot(fig)
-
-            with col2:
-                st.subheader("Term Structure")
-                fig, _ = plot_term_structure(snapshot.raw_options)
-                st.pyplot(fig)
-
-            # Greeks if available - prefer calculated Greeks (bs_*) over Deribit data
-            df = snapshot.raw_options
-            greek_mapping = {
-                'Delta': 'bs_delta' if 'bs_delta' in df.columns else 'delta',
-                'Gamma': 'bs_gamma' if 'bs_gamma' in df.columns else 'gamma',
-                'Vega': 'bs_vega' if 'bs_vega' in df.columns else 'vega'
-            }
-
-            available_greeks = [name for name, col in greek_mapping.items() if col in df.columns and df[col].notna().any()]
-
-            if available_greeks:
-                st.header("🎯 Greeks Surfaces")
-                if any('bs_' in greek_mapping[name] for name in available_greeks):
-                    st.info("ℹ️ Greeks calculated from smoothed Black-Scholes model using interpolated IV surface")
-
-                greek_tabs = st.tabs(available_greeks)
-
-                for idx, greek_name in enumerate(available_greeks):
-                    with greek_tabs[idx]:
-                        greek_col = greek_mapping[greek_name]
-                        fig, _ = plot_greeks_surface_3d(df, snapshot.underlying_price, greek=greek_col)
-                        st.pyplot(fig)
-        else:
-            st.info("ℹ️ Raw options data not available. Only surface-based plots are shown. To see smile, term structure, and Greeks, save snapshots with 'Save Raw Data' enabled.")
+        visualize_snapshot_view(manifest, currency_arg, manifest_mtime)
 
     elif analysis_type == "Compare Surfaces":
-        st.header("🔄 Surface Comparison")
-
-        if len(snapshots) < 2:
-            st.warning("Need at least 2 snapshots for comparison")
-            st.stop()
-
-        col1, col2 = st.columns(2)
-
-        snapshot_labels = [f"{s.timestamp.strftime('%Y-%m-%d %H:%M')} ({s.currency})" for s in snapshots]
-
-        with col1:
-            snap1_idx = st.selectbox("Select First Snapshot", range(len(snapshots)),
-                                     format_func=lambda x: snapshot_labels[x])
-
-        with col2:
-            snap2_idx = st.selectbox("Select Second Snapshot", range(len(snapshots)),
-                                     index=min(1, len(snapshots)-1),
-                                     format_func=lambda x: snapshot_labels[x])
-
-        snap1 = snapshots[snap1_idx]
-        snap2 = snapshots[snap2_idx]
-
-        # Price change
-        price_change = ((snap2.underlying_price / snap1.underlying_price) - 1) * 100
-        st.metric(
-            "Price Change",
-            f"${snap2.underlying_price:,.2f}",
-            f"{price_change:+.2f}%",
-            delta_color="normal"
-        )
-
-        # Comparison visualization
-        st.subheader("Surface Comparison")
-        fig = plot_surface_comparison(snap1, snap2,
-                                      title1=snap1.timestamp.strftime('%Y-%m-%d'),
-                                      title2=snap2.timestamp.strftime('%Y-%m-%d'))
-        st.pyplot(fig)
-
-        # Difference surface
-        st.subheader("Surface Difference (IV Change)")
-        fig = plot_difference_surface(snap1, snap2)
-        st.pyplot(fig)
-
-        # Metrics comparison
-        st.subheader("Metrics Comparison")
-        metrics_comp = []
-        for key in snap1.metrics:
-            if key in snap2.metrics:
-                val1 = snap1.metrics[key]
-                val2 = snap2.metrics[key]
-                if val1 is not None and val2 is not None and not pd.isna(val1) and not pd.isna(val2):
-                    change = (val2 - val1) * 100
-                    metrics_comp.append({
-                        'Metric': key,
-                        'Before': f"{val1*100:.2f}%",
-                        'After': f"{val2*100:.2f}%",
-                        'Change': f"{change:+.2f}pp"
-                    })
-
-        if metrics_comp:
-            st.dataframe(pd.DataFrame(metrics_comp), use_container_width=True, hide_index=True)
+        compare_surfaces_view(manifest, currency_arg, manifest_mtime)
 
     elif analysis_type == "Metrics Time Series":
-        st.header("📊 Metrics Time Series")
-
-        if len(snapshots) < 2:
-            st.warning("Need at least 2 snapshots for time series analysis")
-            st.stop()
-
-        fig = plot_metrics_timeseries(history)
-        st.pyplot(fig)
-
-        # Show data table
-        if st.checkbox("Show Data Table"):
-            ts_df = history.get_metrics_timeseries()
-            st.dataframe(ts_df, use_container_width=True)
+        metrics_timeseries_view(history, manifest, currency_arg, manifest_mtime)
 
 # Footer
 st.sidebar.markdown("---")
@@ -2,44 +2,65 @@
 Data cleaning and processing functions.
 """
 
+import logging
 import pandas as pd
 import numpy as np
 
+logger = logging.getLogger(__name__)
 
-def clean_iv_data(df, min_tte_days=1, moneyness_range=(0.7, 1.3)):
-    """Clean and filter IV data"""
-    print(f"\nStarting with {len(df)} options")
-
-    # Remove options with missing IV
-    df = df.dropna(subset=['mark_iv'])
-    print(f"After removing missing IV: {len(df)}")
+# Columns read after cleaning (metrics, surface fits, Greeks, plots); quote
+# sizes and raw expiration timestamps are never used
+ANALYSIS_COLUMNS = ['instrument', 'strike', 'expiration', 'tte_days', 'tte_years',
+                    'option_type', 'mark_iv', 'moneyness', 'log_moneyness',
+                    'underlying_price']
 
-    # Remove zero or negative IV
-    df = df[df['mark_iv'] > 0]
-    print(f"After removing zero/negative IV: {len(df)}")
 
-    # Remove very short-dated options
-    df = df[df['tte_days'] >= min_tte_days]
-    print(f"After removing options with < {min_tte_days} days: {len(df)}")
-
-    # Remove deep ITM/OTM options
-    df = df[(df['moneyness'] >= moneyness_range[0]) &
-            (df['moneyness'] <= moneyness_range[1])]
-    print(f"After filtering moneyness ({moneyness_range[0]}-{moneyness_range[1]}): {len(df)}")
+def clean_iv_data(df, min_tte_days=1, moneyness_range=(0.7, 1.3)):
+    """Clean and filter IV data"""
+    # Combine all filters into one mask so the frame is only copied once
+    has_iv = df['mark_iv'].notna()
+    positive_iv = has_iv & (df['mark_iv'] > 0)
+    min_tte = positive_iv & (df['tte_days'] >= min_tte_days)
+    mask = min_tte & df['moneyness'].between(*moneyness_range)
+
+    # Per-filter counts are only worth a reduction each when someone is listening
+    if logger.isEnabledFor(logging.INFO):
+        logger.info(f"\nStarting with {len(df)} options")
+        logger.info(f"After removing missing IV: {has_iv.sum()}")
+        logger.info(f"After removing zero/negative IV: {positive_iv.sum()}")
+        logger.info(f"After removing options with < {min_tte_days} days: {min_tte.sum()}")
+        logger.info(f"After filtering moneyness ({moneyness_range[0]}-{moneyness_range[1]}): {mask.sum()}")
+
+    df = df.loc[mask].copy()
 
     # Convert IV from percentage to decimal if needed
     if df['mark_iv'].max() > 10:  # Likely in percentage
         df['mark_iv'] = df['mark_iv'] / 100
-        df['bid_iv'] = df['bid_iv'] / 100
-        df['ask_iv'] = df['ask_iv'] / 100
 
     return df
 
 
+def select_analysis_columns(df):
+    """
+    Keep only the ANALYSIS_COLUMNS present in df, with floats downcast to
+    float32 (quotes carry far less precision; fits upcast where they need to).
+    """
+    df = df[[col for col in ANALYSIS_COLUMNS if col in df.columns]]
+    float_cols = df.select_dtypes('float64').columns
+    return df.astype(dict.fromkeys(float_cols, 'float32'))
+
+
 def separate_by_type(df):
-    """Separate calls and puts"""
-    calls = df[df['option_type'] == 'call'].copy()
-    puts = df[df['option_type'] == 'put'].copy()
+    """
+    Separate calls and puts.
+
+    One groupby pass finds both sets of rows and each is taken once, with no
+    extra defensive copy; callers only read the returned frames.
+    """
+    rows = df.groupby('option_type', sort=False).indices
+    no_rows = np.array([], dtype=np.intp)
+    calls = df.take(rows.get('call', no_rows))
+    puts = df.take(rows.get('put', no_rows))
 
     print(f"\nCalls: {len(calls)}, Puts: {len(puts)}")
     return calls, puts
@@ -48,14 +69,14 @@ def separate_by_type(df):
 def check_call_put_parity(calls, puts, tolerance=0.05):
     """Check for put-call parity violations in IV"""
 
-    merged = calls.merge(
-        puts,
-        on=['strike', 'expiration'],
-        suffixes=('_call', '_put')
-    )
+    # Join only the IV columns on (strike, expiration) instead of whole rows
+    key = ['strike', 'expiration']
+    call_iv = calls.set_index(key)['mark_iv'].to_frame('mark_iv_call')
+    put_iv = puts.set_index(key)['mark_iv'].to_frame('mark_iv_put')
+    merged = call_iv.join(put_iv, how='inner')
 
-    merged['iv_diff'] = abs(merged['mark_iv_call'] - merged['mark_iv_put'])
-    violations = merged[merged['iv_diff'] > tolerance]
+    merged['iv_diff'] = (merged['mark_iv_call'] - merged['mark_iv_put']).abs()
+    violations = merged[merged['iv_diff'] > tolerance].reset_index()
 
     print(f"\nCall-Put Parity Check:")
     print(f"Total strike/expiration pairs: {len(merged)}")
@@ -71,31 +92,35 @@ def check_call_put_parity(calls, puts, tolerance=0.05):
 
 
 def summarize_data(df):
-    """Print summary statistics of the data"""
-
-    print("\n" + "="*60)
-    print("DATA SUMMARY")
-    print("="*60)
-
-    print(f"\nTotal options: {len(df)}")
-    print(f"Unique strikes: {df['strike'].nunique()}")
-    print(f"Unique expirations: {df['expiration'].nunique()}")
-    print(f"Date range: {df['expiration'].min().date()} to {df['expiration'].max().date()}")
-
-    print(f"\nTime to expiration:")
-    print(f"  Min: {df['tte_days'].min():.1f} days")
-    print(f"  Max: {df['tte_days'].max():.1f} days")
-    print(f"  Mean: {df['tte_days'].mean():.1f} days")
-
-    print(f"\nStrike range:")
-    print(f"  Min: ${df['strike'].min():,.0f}")
-    print(f"  Max: ${df['strike'].max():,.0f}")
-    print(f"  Spot: ${df['underlying_price'].iloc[0]:,.0f}")
-
-    print(f"\nImplied Volatility:")
-    print(f"  Min: {df['mark_iv'].min()*100:.1f}%")
-    print(f"  Max: {df['mark_iv'].max()*100:.1f}%")
-    print(f"  Mean: {df['mark_iv'].mean()*100:.1f}%")
-    print(f"  Median: {df['mark_iv'].median()*100:.1f}%")
-
-    print("\n" + "="*60)
+    """Log summary statistics of the data"""
+    if not logger.isEnabledFor(logging.INFO):
+        return
+
+    # All min/max/mean/median reductions in one pass
+    stats = df[['tte_days', 'strike', 'mark_iv']].agg(['min', 'max', 'mean', 'median'])
+    expirations = df['expiration']
+
+    lines = [
+        "\n" + "="*60,
+        "DATA SUMMARY",
+        "="*60,
+        f"\nTotal options: {len(df)}",
+        f"Unique strikes: {df['strike'].nunique()}",
+        f"Unique expirations: {expirations.nunique()}",
+        f"Date range: {expirations.min().date()} to {expirations.max().date()}",
+        f"\nTime to expiration:",
+        f"  Min: {stats.at['min', 'tte_days']:.1f} days",
+        f"  Max: {stats.at['max', 'tte_days']:.1f} days",
+        f"  Mean: {stats.at['mean', 'tte_days']:.1f} days",
+        f"\nStrike range:",
+        f"  Min: ${stats.at['min', 'strike']:,.0f}",
+        f"  Max: ${stats.at['max', 'strike']:,.0f}",
+        f"  Spot: ${df['underlying_price'].iloc[0]:,.0f}",
+        f"\nImplied Volatility:",
+        f"  Min: {stats.at['min', 'mark_iv']*100:.1f}%",
+        f"  Max: {stats.at['max', 'mark_iv']*100:.1f}%",
+        f"  Mean: {stats.at['mean', 'mark_iv']*100:.1f}%",
+        f"  Median: {stats.at['median', 'mark_iv']*100:.1f}%",
+        "\n" + "="*60,
+    ]
+    logger.info("\n".join(lines))
@@ -3,30 +3,95 @@ Deribit API data collection functions.
 """
 
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 import pandas as pd
 import numpy as np
 from datetime import datetime
+from functools import wraps
+import inspect
+import json
+import threading
+import time
 import warnings
 warnings.filterwarnings('ignore')
 
-
+# orjson parses the large instrument / book-summary payloads several times
+# faster than the standard library; it is optional
+try:
+    import orjson
+    _parse_json = orjson.loads
+except ImportError:
+    _parse_json = json.loads
+
+BOOK_SUMMARY_URL = "https://www.deribit.com/api/v2/public/get_book_summary_by_currency"
+
+# Seconds to wait for a Deribit response before giving up
+REQUEST_TIMEOUT = 10
+
+# One keep-alive session for every request: connections (and their TLS
+# handshakes) are pooled and reused, and transient errors are retried
+_session = requests.Session()
+_session.mount('https://', HTTPAdapter(
+    max_retries=Retry(total=3, backoff_factor=0.3, status_forcelist=[429, 500, 502, 503, 504])
+))
+
+# Seconds an index price / DVOL reading is reused for repeat calls
+QUOTE_CACHE_TTL = 30
+
+
+def _ttl_cache(ttl):
+    """
+    Memoize a function for `ttl` seconds per argument set, so back-to-back
+    callers share one request. None results (failed lookups) are not cached.
+    """
+    def decorator(func):
+        signature = inspect.signature(func)
+        cache = {}
+        lock = threading.Lock()
+
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            bound = signature.bind(*args, **kwargs)
+            bound.apply_defaults()
+            key = tuple(bound.arguments.values())
+
+            now = time.monotonic()
+            with lock:
+                hit = cache.get(key)
+            if hit is not None and now - hit[0] < ttl:
+                return hit[1]
+
+            value = func(*args, **kwargs)
+            if value is not None:
+                with lock:
+                    cache[key] = (now, value)
+            return value
+
+        wrapper.cache_clear = cache.clear
+        return wrapper
+    return decorator
+
+
+@_ttl_cache(QUOTE_CACHE_TTL)
 def get_index_price(currency='BTC'):
     """Get current index price for the underlying"""
     url = "https://www.deribit.com/api/v2/public/get_index_price"
     params = {'index_name': f'{currency.lower()}_usd'}
 
-    response = requests.get(url, params=params)
-    return response.json()['result']['index_price']
+    response = _session.get(url, params=params, timeout=REQUEST_TIMEOUT)
+    return _parse_json(response.content)['result']['index_price']
 
 
+@_ttl_cache(QUOTE_CACHE_TTL)
 def get_dvol_index(currency='BTC'):
     """Get current DVOL (volatility index) value"""
     try:
         url = "https://www.deribit.com/api/v2/public/ticker"
         params = {'instrument_name': f'{currency}VOL'}
 
-        response = requests.get(url, params=params)
-        return response.json()['result']['mark_price']
+        response = _session.get(url, params=params, timeout=REQUEST_TIMEOUT)
+        return _parse_json(response.content)['result']['mark_price']
     except:
         return None
 
@@ -40,66 +105,66 @@ def get_all_options_data(currency='BTC'):
         'expired': "false"
     }
 
-    response = requests.get(url, params=params)
-    instruments = response.json()['result']
+    response = _session.get(url, params=params, timeout=REQUEST_TIMEOUT)
+    instruments = _parse_json(response.content)['result']
 
     return instruments
 
 
+def _expiry_columns(expiration_ts, now_ts):
+    """Expiration datetime (UTC) and time to expiration in days and years, vectorized"""
+    tte = (expiration_ts - now_ts) / (365.25 * 24 * 3600)
+    return pd.to_datetime(expiration_ts, unit='s'), tte * 365.25, tte
+
+
+def get_book_summary(currency='BTC'):
+    """Get the book summary (mark IV, volume, open interest) of every option in one request"""
+    params = {'currency': currency, 'kind': 'option'}
+
+    response = _session.get(BOOK_SUMMARY_URL, params=params, timeout=REQUEST_TIMEOUT)
+    return pd.DataFrame(_parse_json(response.content)['result'])
+
+
 def get_option_iv_data(instruments, underlying_price):
-    """Get IV and Greeks for each option"""
-    iv_data = []
-
-    print(f"Fetching data for {len(instruments)} options...")
-
-    for i, inst in enumerate(instruments):
-        if i % 50 == 0:
-            print(f"Progress: {i}/{len(instruments)}")
-
-        ticker_url = "https://www.deribit.com/api/v2/public/ticker"
-        params = {'instrument_name': inst['instrument_name']}
-
-        try:
-            response = requests.get(ticker_url, params=params)
-            ticker = response.json()['result']
-            greeks = ticker.get('greeks', {})
-
-            # Calculate time to expiration in years
-            expiration_ts = inst['expiration_timestamp'] / 1000
-            now = datetime.now().timestamp()
-            tte = (expiration_ts - now) / (365.25 * 24 * 3600)
-
-            # Calculate moneyness
-            strike = inst['strike']
-            moneyness = strike / underlying_price
-            log_moneyness = np.log(moneyness)
-
-            iv_data.append({
-                'instrument': inst['instrument_name'],
-                'strike': strike,
-                'expiration': datetime.fromtimestamp(expiration_ts),
-                'expiration_timestamp': expiration_ts,
-                'tte_days': tte * 365.25,
-                'tte_years': tte,
-                'option_type': inst['option_type'],
-                'mark_iv': ticker.get('mark_iv', np.nan),
-                'bid_iv': ticker.get('bid_iv', np.nan),
-                'ask_iv': ticker.get('ask_iv', np.nan),
-                'moneyness': moneyness,
-                'log_moneyness': log_moneyness,
-                'delta': greeks.get('delta', np.nan),
-                'gamma': greeks.get('gamma', np.nan),
-                'theta': greeks.get('theta', np.nan),
-                'vega': greeks.get('vega', np.nan),
-                'rho': greeks.get('rho', np.nan),
-                'volume': ticker.get('stats', {}).get('volume', 0),
-                'open_interest': ticker.get('open_interest', 0),
-                'underlying_price': underlying_price
-            })
-
-        except Exception as e:
-            print(f"Error fetching {inst['instrument_name']}: {e}")
-            continue
+    """
+    Get IV for each option.
+
+    A single book-summary request supplies mark IV, volume and open interest
+    for the whole chain. It carries no Greeks; the app and CLI compute them
+    from the fitted surface (bs_* columns).
+    """
+    print(f"Fetching book summary for {len(instruments)} options...")
+
+    inst_df = pd.DataFrame(instruments, columns=['instrument_name', 'strike',
+                                                 'expiration_timestamp', 'option_type',
+                                                 'base_currency'])
+    if inst_df.empty:
+        return pd.DataFrame()
+
+    summary = get_book_summary(inst_df['base_currency'].iloc[0])
+    df = inst_df.merge(summary[['instrument_name', 'mark_iv', 'volume', 'open_interest']],
+                       on='instrument_name', how='inner')
+
+    # Time to expiration and moneyness for the whole chain at once
+    expiration_ts = df['expiration_timestamp'] / 1000
+    expiration, tte_days, tte_years = _expiry_columns(expiration_ts, datetime.now().timestamp())
+    moneyness = df['strike'] / underlying_price
+
+    iv_data = pd.DataFrame({
+        'instrument': df['instrument_name'],
+        'strike': df['strike'],
+        'expiration': expiration,
+        'expiration_timestamp': expiration_ts,
+        'tte_days': tte_days,
+        'tte_years': tte_years,
+        'option_type': df['option_type'],
+        'mark_iv': df['mark_iv'],
+        'moneyness': moneyness,
+        'log_moneyness': np.log(moneyness),
+        'volume': df['volume'].fillna(0),
+        'open_interest': df['open_interest'].fillna(0),
+        'underlying_price': underlying_price
+    })
 
     print("Data collection complete!")
-    return pd.DataFrame(iv_data)
+    return iv_data
@@ -3,8 +3,33 @@ Black-Scholes Greeks calculation using smoothed implied volatility surface.
 """
 
 import numpy as np
-from scipy.stats import norm
-from scipy.interpolate import RegularGridInterpolator
+from scipy.special import ndtr
+
+# Standard normal density constant; ndtr is the standard normal CDF
+_INV_SQRT_2PI = 1 / np.sqrt(2 * np.pi)
+
+
+def _norm_pdf(x):
+    """Standard normal PDF, without scipy.stats' distribution-object overhead"""
+    return np.exp(-0.5 * x * x) * _INV_SQRT_2PI
+
+
+def _logistic_cdf(x):
+    """
+    Logistic approximation of the standard normal CDF, 1 / (1 + exp(-1.702x)).
+
+    About twice as fast as ndtr with a maximum absolute error of ~1e-2: fine
+    for shading a plot, not for risk or P&L numbers.
+    """
+    return 1.0 / (1.0 + np.exp(-1.702 * x))
+
+
+def _d1_d2_sqrt_T(S, K, T, r, sigma):
+    """d1, d2 and sqrt(T), with sqrt(T) and sigma*sqrt(T) evaluated once"""
+    sqrt_T = np.sqrt(T)
+    sigma_sqrt_T = sigma * sqrt_T
+    d1 = (np.log(S / K) + (r + 0.5 * sigma**2) * T) / sigma_sqrt_T
+    return d1, d1 - sigma_sqrt_T, sqrt_T
 
 
 def calculate_d1_d2(S, K, T, r, sigma):
@@ -28,8 +53,7 @@ def calculate_d1_d2(S, K, T, r, sigma):
     --------
     d1, d2 : float or array
     """
-    d1 = (np.log(S / K) + (r + 0.5 * sigma**2) * T) / (sigma * np.sqrt(T))
-    d2 = d1 - sigma * np.sqrt(T)
+    d1, d2, _ = _d1_d2_sqrt_T(S, K, T, r, sigma)
     return d1, d2
 
 
@@ -57,11 +81,12 @@ def black_scholes_price(S, K, T, r, sigma, option_type='call'):
     price : float or array
     """
     d1, d2 = calculate_d1_d2(S, K, T, r, sigma)
+    discounted_K = K * np.exp(-r * T)
 
     if option_type.lower() == 'call':
-        price = S * norm.cdf(d1) - K * np.exp(-r * T) * norm.cdf(d2)
+        price = S * ndtr(d1) - discounted_K * ndtr(d2)
     else:  # put
-        price = K * np.exp(-r * T) * norm.cdf(-d2) - S * norm.cdf(-d1)
+        price = discounted_K * ndtr(-d2) - S * ndtr(-d1)
 
     return price
 
@@ -92,9 +117,9 @@ def calculate_delta(S, K, T, r, sigma, option_type='call'):
     d1, _ = calculate_d1_d2(S, K, T, r, sigma)
 
     if option_type.lower() == 'call':
-        delta = norm.cdf(d1)
+        delta = ndtr(d1)
     else:  # put
-        delta = norm.cdf(d1) - 1
+        delta = ndtr(d1) - 1
 
     return delta
 
@@ -120,8 +145,8 @@ def calculate_gamma(S, K, T, r, sigma):
     --------
     gamma : float or array
     """
-    d1, _ = calculate_d1_d2(S, K, T, r, sigma)
-    gamma = norm.pdf(d1) / (S * sigma * np.sqrt(T))
+    d1, _, sqrt_T = _d1_d2_sqrt_T(S, K, T, r, sigma)
+    gamma = _norm_pdf(d1) / (S * sigma * sqrt_T)
     return gamma
 
 
@@ -147,8 +172,8 @@ def calculate_vega(S, K, T, r, sigma):
     vega : float or array
         Vega (per 1% change in volatility)
     """
-    d1, _ = calculate_d1_d2(S, K, T, r, sigma)
-    vega = S * norm.pdf(d1) * np.sqrt(T) / 100  # Divide by 100 for 1% change
+    d1, _, sqrt_T = _d1_d2_sqrt_T(S, K, T, r, sigma)
+    vega = S * _norm_pdf(d1) * sqrt_T / 100  # Divide by 100 for 1% change
     return vega
 
 
@@ -176,15 +201,15 @@ def calculate_theta(S, K, T, r, sigma, option_type='call'):
     theta : float or array
         Theta (per day)
     """
-    d1, d2 = calculate_d1_d2(S, K, T, r, sigma)
+    d1, d2, sqrt_T = _d1_d2_sqrt_T(S, K, T, r, sigma)
 
-    term1 = -(S * norm.pdf(d1) * sigma) / (2 * np.sqrt(T))
+    term1 = -(S * _norm_pdf(d1) * sigma) / (2 * sqrt_T)
 
     if option_type.lower() == 'call':
-        term2 = -r * K * np.exp(-r * T) * norm.cdf(d2)
+        term2 = -r * K * np.exp(-r * T) * ndtr(d2)
         theta = term1 + term2
     else:  # put
-        term2 = r * K * np.exp(-r * T) * norm.cdf(-d2)
+        term2 = r * K * np.exp(-r * T) * ndtr(-d2)
         theta = term1 + term2
 
     # Convert to per-day theta
@@ -220,15 +245,80 @@ def calculate_rho(S, K, T, r, sigma, option_type='call'):
     _, d2 = calculate_d1_d2(S, K, T, r, sigma)
 
     if option_type.lower() == 'call':
-        rho = K * T * np.exp(-r * T) * norm.cdf(d2) / 100
+        rho = K * T * np.exp(-r * T) * ndtr(d2) / 100
     else:  # put
-        rho = -K * T * np.exp(-r * T) * norm.cdf(-d2) / 100
+        rho = -K * T * np.exp(-r * T) * ndtr(-d2) / 100
 
     return rho
 
 
+def _greeks_kernel(S, K, T, r, sigma, is_call, fast=False):
+    """
+    All five Black-Scholes Greeks in one fused, vectorized pass.
+
+    d1/d2, the normal pdf and cdf and the discount factor are evaluated once
+    per option and shared by every Greek, for calls and puts together.
+
+    Parameters:
+    -----------
+    S : float
+        Underlying price
+    K, T, sigma : np.ndarray
+        Strike, time to expiration (years) and implied volatility per option
+    r : float
+        Risk-free rate
+    is_call : np.ndarray of bool
+        True for calls, False for puts
+    fast : bool
+        Use the logistic approximation of the normal CDF (plotting only)
+
+    Returns:
+    --------
+    delta, gamma, vega, theta, rho : np.ndarray
+        Same units as calculate_delta, calculate_gamma, calculate_vega,
+        calculate_theta and calculate_rho
+    """
+    d1, d2, sqrt_T = _d1_d2_sqrt_T(S, K, T, r, sigma)
+
+    cdf = _logistic_cdf if fast else ndtr
+    pdf_d1 = _norm_pdf(d1)
+    cdf_d1 = cdf(d1)
+    # Puts use N(-d2) = 1 - N(d2); sign flips below restore the put formulas
+    cdf_d2 = cdf(np.where(is_call, d2, -d2))
+    discounted_K = K * np.exp(-r * T)
+    sign = np.where(is_call, 1.0, -1.0)
+
+    delta = np.where(is_call, cdf_d1, cdf_d1 - 1)
+    gamma = pdf_d1 / (S * sigma * sqrt_T)
+    vega = S * pdf_d1 * sqrt_T / 100
+    theta = (-(S * pdf_d1 * sigma) / (2 * sqrt_T) - sign * r * discounted_K * cdf_d2) / 365
+    rho = sign * discounted_K * T * cdf_d2 / 100
+
+    return delta, gamma, vega, theta, rho
+
+
+def _bilinear_on_grid(x, y, xgrid, ygrid, Z):
+    """
+    Bilinear interpolation of Z (shape (len(xgrid), len(ygrid))) at points (x, y).
+
+    Grid cells are located with a binary search over each sorted axis and the
+    four corners blended in one vectorized pass. Cell widths are inverted once
+    per grid node rather than once per point. Points must lie inside the grid
+    and each axis needs at least two nodes; NaN corners propagate.
+    """
+    inv_dx = 1.0 / np.diff(xgrid)
+    inv_dy = 1.0 / np.diff(ygrid)
+    ix = np.clip(np.searchsorted(xgrid, x) - 1, 0, len(xgrid) - 2)
+    iy = np.clip(np.searchsorted(ygrid, y) - 1, 0, len(ygrid) - 2)
+    tx = (x - xgrid[ix]) * inv_dx[ix]
+    ty = (y - ygrid[iy]) * inv_dy[iy]
+
+    return ((1 - tx) * (1 - ty) * Z[ix, iy] + tx * (1 - ty) * Z[ix + 1, iy]
+            + (1 - tx) * ty * Z[ix, iy + 1] + tx * ty * Z[ix + 1, iy + 1])
+
+
 def calculate_greeks_from_surface(df, log_moneyness_mesh, tte_mesh, iv_surface,
-                                  underlying_price, risk_free_rate=0.0):
+                                  underlying_price, risk_free_rate=0.0, fast=False):
     """
     Calculate Greeks for all options using the smoothed IV surface.
 
@@ -246,56 +336,45 @@ def calculate_greeks_from_surface(df, log_moneyness_mesh, tte_mesh, iv_surface,
         Current underlying price
     risk_free_rate : float
         Risk-free rate (default: 0.0)
+    fast : bool
+        Approximate the normal CDF with a logistic function (max error ~1e-2);
+        good enough for plot shading, not for risk reporting (default: False)
 
     Returns:
     --------
     df : pd.DataFrame
         DataFrame with added columns: bs_delta, bs_gamma, bs_vega, bs_theta, bs_rho
     """
-    # Create interpolator for the IV surface
-    # Need unique sorted values for interpolator
-    log_m_unique = np.unique(log_moneyness_mesh.ravel())
-    tte_unique = np.unique(tte_mesh.ravel())
-
-    # Reshape IV surface to match the grid
-    # Assume log_moneyness varies along axis 0, tte along axis 1
-    n_log_m = len(log_m_unique)
-    n_tte = len(tte_unique)
-
-    # Create regular grid IV surface
-    iv_grid = np.zeros((n_log_m, n_tte))
-    for i, log_m in enumerate(log_m_unique):
-        for j, tte in enumerate(tte_unique):
-            # Find closest point in mesh
-            mask = (log_moneyness_mesh == log_m) & (tte_mesh == tte)
-            if mask.any():
-                iv_grid[i, j] = iv_surface[mask][0]
-
-    # Create interpolator
-    interpolator = RegularGridInterpolator(
-        (log_m_unique, tte_unique),
-        iv_grid,
-        method='linear',
-        bounds_error=False,
-        fill_value=None  # Use nearest neighbor for extrapolation
-    )
+    # Regular (log-moneyness, tte) grid from the mesh. The surface builders'
+    # np.meshgrid layout (tte along rows, log-moneyness along columns, both
+    # increasing) already is that grid, transposed
+    log_m_axis = log_moneyness_mesh[0, :]
+    tte_axis = tte_mesh[:, 0]
+    if (np.all(np.diff(log_m_axis) > 0) and np.all(np.diff(tte_axis) > 0)
+            and np.array_equal(log_moneyness_mesh, np.broadcast_to(log_m_axis, log_moneyness_mesh.shape))
+            and np.array_equal(tte_mesh, np.broadcast_to(tte_axis[:, None], tte_mesh.shape))):
+        log_m_unique, tte_unique = log_m_axis, tte_axis
+        iv_grid = np.asarray(iv_surface, dtype=np.float64).T
+    else:
+        # Any other layout: unique sorted axis values, with each mesh point
+        # scattered to its cell in one pass; cells the mesh doesn't cover stay 0
+        log_m_unique, log_m_idx = np.unique(log_moneyness_mesh.ravel(), return_inverse=True)
+        tte_unique, tte_idx = np.unique(tte_mesh.ravel(), return_inverse=True)
+        iv_grid = np.zeros((len(log_m_unique), len(tte_unique)))
+        iv_grid[log_m_idx, tte_idx] = np.ravel(iv_surface)
 
     # Calculate log-moneyness for each option
     df['log_moneyness_calc'] = np.log(df['strike'] / underlying_price)
 
-    # Get smoothed IV for each option from the surface
-    points = np.column_stack([df['log_moneyness_calc'].values, df['tte_years'].values])
-
-    # Handle points outside the domain by clipping
-    points[:, 0] = np.clip(points[:, 0], log_m_unique.min(), log_m_unique.max())
-    points[:, 1] = np.clip(points[:, 1], tte_unique.min(), tte_unique.max())
-
-    smoothed_iv = interpolator(points)
+    # Smoothed IV for each option, with points outside the domain clipped to it;
+    # both coordinates are clipped straight into one float64 buffer
+    points = np.empty((2, len(df)))
+    np.clip(df['log_moneyness_calc'].to_numpy(), log_m_unique[0], log_m_unique[-1], out=points[0])
+    np.clip(df['tte_years'].to_numpy(), tte_unique[0], tte_unique[-1], out=points[1])
+    smoothed_iv = _bilinear_on_grid(points[0], points[1], log_m_unique, tte_unique, iv_grid)
 
     # Replace any NaN values with original mark_iv
-    mask_nan = np.isnan(smoothed_iv)
-    if mask_nan.any():
-        smoothed_iv[mask_nan] = df.loc[mask_nan, 'mark_iv'].values
+    smoothed_iv = np.where(np.isnan(smoothed_iv), df['mark_iv'].to_numpy(), smoothed_iv)
 
     df['smoothed_iv'] = smoothed_iv
 
@@ -305,42 +384,21 @@ def calculate_greeks_from_surface(df, log_moneyness_mesh, tte_mesh, iv_surface,
     T = df['tte_years'].values
     sigma = smoothed_iv
 
-    # Filter out very short-dated options (< 1 hour) to avoid numerical issues
-    valid_mask = T > (1/24/365)
-
-    # Initialize arrays
-    df['bs_delta'] = np.nan
-    df['bs_gamma'] = np.nan
-    df['bs_vega'] = np.nan
-    df['bs_theta'] = np.nan
-    df['bs_rho'] = np.nan
-
-    # Calculate for calls
-    call_mask = valid_mask & (df['option_type'] == 'call')
-    if call_mask.any():
-        df.loc[call_mask, 'bs_delta'] = calculate_delta(S, K[call_mask], T[call_mask],
-                                                         risk_free_rate, sigma[call_mask], 'call')
-        df.loc[call_mask, 'bs_gamma'] = calculate_gamma(S, K[call_mask], T[call_mask],
-                                                         risk_free_rate, sigma[call_mask])
-        df.loc[call_mask, 'bs_vega'] = calculate_vega(S, K[call_mask], T[call_mask],
-                                                       risk_free_rate, sigma[call_mask])
-        df.loc[call_mask, 'bs_theta'] = calculate_theta(S, K[call_mask], T[call_mask],
-                                                         risk_free_rate, sigma[call_mask], 'call')
-        df.loc[call_mask, 'bs_rho'] = calculate_rho(S, K[call_mask], T[call_mask],
-                                                     risk_free_rate, sigma[call_mask], 'call')
-
-    # Calculate for puts
-    put_mask = valid_mask & (df['option_type'] == 'put')
-    if put_mask.any():
-        df.loc[put_mask, 'bs_delta'] = calculate_delta(S, K[put_mask], T[put_mask],
-                                                        risk_free_rate, sigma[put_mask], 'put')
-        df.loc[put_mask, 'bs_gamma'] = calculate_gamma(S, K[put_mask], T[put_mask],
-                                                        risk_free_rate, sigma[put_mask])
-        df.loc[put_mask, 'bs_vega'] = calculate_vega(S, K[put_mask], T[put_mask],
-                                                      risk_free_rate, sigma[put_mask])
-        df.loc[put_mask, 'bs_theta'] = calculate_theta(S, K[put_mask], T[put_mask],
-                                                        risk_free_rate, sigma[put_mask], 'put')
-        df.loc[put_mask, 'bs_rho'] = calculate_rho(S, K[put_mask], T[put_mask],
-                                                    risk_free_rate, sigma[put_mask], 'put')
+    # Filter out very short-dated options (< 1 hour) and non-positive or
+    # missing vols to avoid numerical issues; the kernel only sees valid rows
+    valid_mask = (T > (1/24/365)) & (sigma > 0)
+
+    # Greeks for all calls and puts in one kernel call; others stay NaN
+    valid_mask &= df['option_type'].isin(['call', 'put']).to_numpy()
+    is_call = (df['option_type'] == 'call').to_numpy()[valid_mask]
+
+    greek_values = _greeks_kernel(S, K[valid_mask], T[valid_mask], risk_free_rate,
+                                  sigma[valid_mask], is_call, fast=fast)
+
+    for name, values in zip(['bs_delta', 'bs_gamma', 'bs_vega', 'bs_theta', 'bs_rho'],
+                            greek_values):
+        column = np.full(len(df), np.nan)
+        column[valid_mask] = values
+        df[name] = column
 
     return df
@@ -8,14 +8,15 @@ Usage:
 """
 
 import argparse
+import logging
 from datetime import datetime
 import sys
 
 from deribit_api import get_index_price, get_dvol_index, get_all_options_data, get_option_iv_data
-from data_processing import clean_iv_data, separate_by_type, check_call_put_parity, summarize_data
+from data_processing import clean_iv_data, select_analysis_columns, separate_by_type, check_call_put_parity, summarize_data
 from surface_builder import create_simple_surface, create_rbf_surface, create_svi_surface
 from metrics import calculate_surface_metrics
-from snapshot import SurfaceSnapshot, SurfaceHistory
+from snapshot import SurfaceSnapshot, SurfaceHistory, slim_raw_options
 from visualizations import (plot_volatility_surface, plot_volatility_smile,
                            plot_term_structure, plot_heatmap, plot_greeks_surface_3d)
 from greeks import calculate_greeks_from_surface
@@ -79,7 +80,7 @@ def build_volatility_surface(currency='BTC', method='rbf', save_snapshot=False,
         sys.exit(1)
 
     # Clean data
-    df = clean_iv_data(df)
+    df = select_analysis_columns(clean_iv_data(df))
 
     # Summarize
     summarize_data(df)
@@ -130,7 +131,7 @@ def build_volatility_surface(currency='BTC', method='rbf', save_snapshot=False,
         underlying_price=underlying_price,
         dvol=dvol,
         surface_data=(log_m_mesh, tte_mesh, iv_surf),
-        raw_options=df,
+        raw_options=slim_raw_options(df) if save_raw else df,
         metrics=metrics
     )
 
@@ -178,12 +179,8 @@ def build_volatility_surface(currency='BTC', method='rbf', save_snapshot=False,
         save_path = str(save_path_base / f"{currency}_volatility_heatmap.png") if save_plots else None
         plot_heatmap(log_m_mesh, tte_mesh, iv_surf, underlying_price, save_path=save_path)
 
-        # Plot Greek surfaces - use calculated Greeks (bs_*) if available, otherwise Deribit data
-        greek_mapping = {
-            'delta': 'bs_delta' if 'bs_delta' in df.columns else 'delta',
-            'gamma': 'bs_gamma' if 'bs_gamma' in df.columns else 'gamma',
-            'vega': 'bs_vega' if 'bs_vega' in df.columns else 'vega'
-        }
+        # Plot Greek surfaces from the calculated Greeks (bs_*)
+        greek_mapping = {'delta': 'bs_delta', 'gamma': 'bs_gamma', 'vega': 'bs_vega'}
 
         for greek_name, greek_col in greek_mapping.items():
             if greek_col in df.columns and df[greek_col].notna().any():
@@ -281,6 +278,9 @@ Examples:
 
     args = parser.parse_args()
 
+    # Data cleaning and summary reports go through logging; show them on the console
+    logging.basicConfig(level=logging.INFO, format='%(message)s')
+
     # Validate arguments
     if args.save_raw and not args.save:
         print("Warning: --save-raw requires --save. Enabling --save.")
@@ -4,34 +4,50 @@ Surface metrics calculation functions.
 
 import numpy as np
 
+# Tenors (days) of the ATM implied volatility metrics
+ATM_TENORS = [7, 30, 60, 90, 180]
+
+
+def _nanmean(values):
+    """Mean ignoring NaN; NaN (without a warning) when nothing is left"""
+    values = values[~np.isnan(values)]
+    return values.mean() if len(values) else np.nan
+
 
 def calculate_surface_metrics(df, underlying_price):
     """Calculate key metrics from the volatility surface"""
 
     metrics = {}
 
-    # ATM volatilities for different tenors
-    for tenor in [7, 30, 60, 90, 180]:
-        tenor_df = df[(df['tte_days'] >= tenor - 5) & (df['tte_days'] <= tenor + 5)]
-        atm_df = tenor_df[(tenor_df['moneyness'] >= 0.98) & (tenor_df['moneyness'] <= 1.02)]
+    tte_days = df['tte_days'].to_numpy(dtype=np.float64)
+    moneyness = df['moneyness'].to_numpy(dtype=np.float64)
+    iv = df['mark_iv'].to_numpy(dtype=np.float64)
+    has_iv = ~np.isnan(iv)
+    iv_values = np.where(has_iv, iv, 0.0)
 
-        if len(atm_df) > 0:
-            metrics[f'atm_iv_{tenor}d'] = atm_df['mark_iv'].mean()
-        else:
-            metrics[f'atm_iv_{tenor}d'] = np.nan
+    # Bucket every option into its tenor window (tenor +/- 5 days) in one pass;
+    # the windows don't overlap, so each option lands in at most one
+    tenors = np.array(ATM_TENORS)
+    window = np.searchsorted(tenors - 5, tte_days, side='right') - 1
+    in_window = window >= 0
+    in_window[in_window] &= tte_days[in_window] <= tenors[window[in_window]] + 5
+
+    # ATM volatilities for different tenors
+    atm = in_window & has_iv & (moneyness >= 0.98) & (moneyness <= 1.02)
+    atm_count = np.bincount(window[atm], minlength=len(tenors))
+    atm_sum = np.bincount(window[atm], weights=iv_values[atm], minlength=len(tenors))
+    for tenor, total, count in zip(ATM_TENORS, atm_sum, atm_count):
+        metrics[f'atm_iv_{tenor}d'] = total / count if count > 0 else np.nan
 
     # 25-delta skew (typical measure)
     # Approximate 25-delta as ~10% OTM for both puts and calls
-    put_25d = df[(df['option_type'] == 'put') &
-                 (df['moneyness'] >= 0.88) & (df['moneyness'] <= 0.92) &
-                 (df['tte_days'] >= 25) & (df['tte_days'] <= 35)]
-
-    call_25d = df[(df['option_type'] == 'call') &
-                  (df['moneyness'] >= 1.08) & (df['moneyness'] <= 1.12) &
-                  (df['tte_days'] >= 25) & (df['tte_days'] <= 35)]
+    option_type = df['option_type'].to_numpy()
+    month = in_window & (window == ATM_TENORS.index(30))
+    put_25d = month & (option_type == 'put') & (moneyness >= 0.88) & (moneyness <= 0.92)
+    call_25d = month & (option_type == 'call') & (moneyness >= 1.08) & (moneyness <= 1.12)
 
-    if len(put_25d) > 0 and len(call_25d) > 0:
-        metrics['skew_25d'] = put_25d['mark_iv'].mean() - call_25d['mark_iv'].mean()
+    if put_25d.any() and call_25d.any():
+        metrics['skew_25d'] = _nanmean(iv[put_25d]) - _nanmean(iv[call_25d])
     else:
         metrics['skew_25d'] = np.nan
 
@@ -48,4 +64,5 @@ def calculate_surface_metrics(df, underlying_price):
     metrics['iv_min'] = df['mark_iv'].min()
     metrics['iv_max'] = df['mark_iv'].max()
 
-    return metrics
+    # Plain floats whatever the column dtype, so metrics stay JSON-serializable
+    return {name: float(value) for name, value in metrics.items()}
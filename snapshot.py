@@ -2,50 +2,169 @@
 Historical volatility surface snapshot management.
 """
 
+import bisect
 import json
+import os
 import numpy as np
 import pandas as pd
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 from pathlib import Path
 
+MANIFEST_FILENAME = 'manifest.json'
+MANIFEST_COLUMNS = ['timestamp', 'currency', 'path', 'underlying_price', 'dvol', 'metrics']
+
+# Raw option columns read back by the historical smile, term structure and Greeks plots
+RAW_OPTION_COLUMNS = ['strike', 'expiration', 'option_type', 'tte_days', 'tte_years',
+                      'moneyness', 'log_moneyness', 'mark_iv',
+                      'bs_delta', 'bs_gamma', 'bs_vega']
+
+
+def _find_raw_file(raw_path):
+    """Resolve a compressed raw pickle path, falling back to an uncompressed .pkl"""
+    raw_path = Path(raw_path)
+    for candidate in (raw_path, raw_path.with_suffix('')):
+        if candidate.exists():
+            return candidate
+    return None
+
+
+def slim_raw_options(df):
+    """
+    Reduce an options DataFrame to RAW_OPTION_COLUMNS with floats downcast to
+    float32 and option_type categorical, for saving alongside a snapshot.
+    """
+    df = df[[col for col in RAW_OPTION_COLUMNS if col in df.columns]]
+    dtypes = dict.fromkeys(df.select_dtypes('float64').columns, 'float32')
+    if 'option_type' in df.columns:
+        dtypes['option_type'] = 'category'
+    return df.astype(dtypes)
+
+
+def _m4_downsample(df, bins, columns=None):
+    """
+    M4 downsampling of a time-indexed frame for plotting.
+
+    The index is split into `bins` equal time bins and, per bin, the first and
+    last rows plus the rows holding each of `columns`' min and max are kept
+    (default: every numeric column), so lines drawn from those columns are
+    visually identical to the full series. That is at most 2 + 2 * len(columns)
+    rows per bin, and exactly M4's four points per bin for a single column.
+    """
+    if bins is None or len(df) <= 4 * bins:
+        return df
+
+    bin_ids = pd.Series(pd.cut(df.index, bins, labels=False), index=df.index)
+    numeric = df.select_dtypes('number')
+    if columns is not None:
+        numeric = numeric[[col for col in columns if col in numeric.columns]]
+    grouped = numeric.groupby(bin_ids)
+
+    keep = (~bin_ids.duplicated(keep='first')) | (~bin_ids.duplicated(keep='last'))
+    keep |= numeric.eq(grouped.transform('min')).any(axis=1)
+    keep |= numeric.eq(grouped.transform('max')).any(axis=1)
+    return df[keep.to_numpy()]
+
 
 class SurfaceSnapshot:
     """Container for a single volatility surface snapshot"""
 
     def __init__(self, timestamp, currency, underlying_price, dvol,
-                 surface_data, raw_options, metrics):
+                 surface_data, raw_options, metrics, surface_path=None, raw_path=None):
         self.timestamp = timestamp
         self.currency = currency
         self.underlying_price = underlying_price
         self.dvol = dvol
-        self.surface_data = surface_data  # (log_m_mesh, tte_mesh, iv_surf)
-        self.raw_options = raw_options
         self.metrics = metrics
 
-    def to_dict(self):
+        # Heavy payloads stored in separate files are loaded on first access
+        self._surface_path = surface_path
+        self._raw_path = raw_path
+        if surface_data is not None or surface_path is None:
+            self.surface_data = surface_data  # (log_m_mesh, tte_mesh, iv_surf)
+        if raw_options is not None or raw_path is None:
+            self.raw_options = raw_options
+
+    def __getattr__(self, name):
+        """Lazy-load surface_data / raw_options from disk on first access"""
+        # Only called when normal lookup fails, i.e. the payload isn't loaded yet
+        if name == 'surface_data':
+            value = self._load_surface_data()
+        elif name == 'raw_options':
+            value = self._load_raw_options()
+        else:
+            raise AttributeError(f"'{type(self).__name__}' object has no attribute '{name}'")
+
+        setattr(self, name, value)
+        return value
+
+    def ensure_loaded(self):
+        """Resolve the lazily loaded surface meshes now rather than on first access"""
+        if 'surface_data' not in self.__dict__:
+            self.surface_data = self._load_surface_data()
+        return self
+
+    def _load_surface_data(self):
+        """Memory-map surface meshes from the snapshot's .npy file"""
+        path = self.__dict__.get('_surface_path')
+        if path is None:
+            return None
+
+        path = Path(path)
+        if not path.exists():
+            return None
+
+        # Read-only mapping: pages are read from disk only when touched
+        stacked = np.load(path, mmap_mode='r')
+        return (stacked[0], stacked[1], stacked[2])
+
+    def _load_raw_options(self):
+        """Load raw options data from the snapshot's pickle file"""
+        path = self.__dict__.get('_raw_path')
+        if path is None:
+            return None
+
+        path = _find_raw_file(path)
+        if path is None:
+            return None
+
+        try:
+            return pd.read_pickle(path)
+        except Exception as e:
+            print(f"Error loading raw data: {e}")
+            return None
+
+    def to_dict(self, include_surface=True):
         """Convert to dictionary for serialization"""
-        return {
+        data = {
             'timestamp': self.timestamp.isoformat(),
             'currency': self.currency,
             'underlying_price': self.underlying_price,
             'dvol': self.dvol,
-            'surface_data': {
+            'metrics': self.metrics
+        }
+        if include_surface:
+            data['surface_data'] = {
                 'log_moneyness_mesh': self.surface_data[0].tolist(),
                 'tte_mesh': self.surface_data[1].tolist(),
                 'iv_surface': self.surface_data[2].tolist()
-            },
-            'metrics': self.metrics
-        }
+            }
+        return data
 
     @classmethod
-    def from_dict(cls, data):
+    def from_dict(cls, data, surface_path=None, raw_path=None):
         """Create from dictionary"""
         timestamp = datetime.fromisoformat(data['timestamp'])
-        surface_data = (
-            np.array(data['surface_data']['log_moneyness_mesh']),
-            np.array(data['surface_data']['tte_mesh']),
-            np.array(data['surface_data']['iv_surface'])
-        )
+
+        # Older snapshots embed the surface in the JSON itself
+        surface_data = None
+        if 'surface_data' in data:
+            surface_data = (
+                np.array(data['surface_data']['log_moneyness_mesh']),
+                np.array(data['surface_data']['tte_mesh']),
+                np.array(data['surface_data']['iv_surface'])
+            )
+            surface_path = None
 
         return cls(
             timestamp=timestamp,
@@ -54,7 +173,9 @@ class SurfaceSnapshot:
             dvol=data['dvol'],
             surface_data=surface_data,
             raw_options=None,  # Don't store raw data in JSON
-            metrics=data['metrics']
+            metrics=data['metrics'],
+            surface_path=surface_path,
+            raw_path=raw_path
         )
 
 
@@ -64,89 +185,226 @@ class SurfaceHistory:
     def __init__(self, storage_dir='vol_surface_history'):
         self.storage_dir = Path(storage_dir)
         self.storage_dir.mkdir(exist_ok=True)
+        self.manifest_path = self.storage_dir / MANIFEST_FILENAME
         self.snapshots = []
+        self._manifest = None
+        # Per-currency timestamp/path lists kept sorted for binary search
+        self._sorted_ts = {}
+        self._sorted_paths = {}
+
+    def _snapshot_files(self):
+        """Snapshot JSON files on disk (excludes the manifest)"""
+        return sorted(p for p in self.storage_dir.glob('*.json') if p.name != MANIFEST_FILENAME)
+
+    @staticmethod
+    def _manifest_row(snapshot, filename):
+        """Manifest entry for a snapshot: scalars and metrics, no surface data"""
+        return {
+            'timestamp': snapshot.timestamp.isoformat(),
+            'currency': snapshot.currency,
+            'path': filename,
+            'underlying_price': snapshot.underlying_price,
+            'dvol': snapshot.dvol,
+            'metrics': snapshot.metrics
+        }
+
+    def _read_manifest_rows(self):
+        """Read raw manifest rows from disk"""
+        if not self.manifest_path.exists():
+            return []
+
+        try:
+            with open(self.manifest_path, 'r') as f:
+                return json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"Error reading manifest, rebuilding: {e}")
+            return []
+
+    def _write_manifest_rows(self, rows):
+        """Write manifest rows to disk atomically"""
+        tmp_path = self.manifest_path.with_suffix('.tmp')
+        with open(tmp_path, 'w') as f:
+            json.dump(rows, f)
+        tmp_path.replace(self.manifest_path)
+
+    def _load_manifest(self):
+        """
+        Load the snapshot manifest as a DataFrame sorted by timestamp.
+
+        The manifest is memoized. Snapshot files missing from it are indexed
+        (read once) and entries whose files were deleted are dropped, so
+        directories written before the manifest existed still work.
+        """
+        if self._manifest is not None:
+            return self._manifest
+
+        rows = self._read_manifest_rows()
+        on_disk = {p.name for p in self._snapshot_files()}
+        indexed = {row['path'] for row in rows}
+
+        changed = len(indexed - on_disk) > 0
+        rows = [row for row in rows if row['path'] in on_disk]
+
+        for filename in sorted(on_disk - indexed):
+            snapshot = self.load_snapshot(self.storage_dir / filename)
+            rows.append(self._manifest_row(snapshot, filename))
+            changed = True
+
+        if changed:
+            self._write_manifest_rows(rows)
+
+        manifest = pd.DataFrame(rows, columns=MANIFEST_COLUMNS)
+        # isoformat() drops the fraction when microseconds are 0, so precisions mix
+        manifest['timestamp'] = pd.to_datetime(manifest['timestamp'], format='ISO8601')
+        manifest['path'] = [str(self.storage_dir / name) for name in manifest['path']]
+        self._manifest = manifest.sort_values('timestamp').reset_index(drop=True)
+        return self._manifest
+
+    def get_manifest(self, currency=None):
+        """Get manifest rows (timestamp, currency, path, price, dvol, metrics)"""
+        manifest = self._load_manifest()
+        if currency:
+            manifest = manifest[manifest['currency'] == currency].reset_index(drop=True)
+        return manifest
+
+    def _sorted_index(self, currency=None):
+        """Sorted snapshot timestamps and paths, built once from the manifest"""
+        if currency not in self._sorted_ts:
+            manifest = self.get_manifest(currency=currency)
+            self._sorted_ts[currency] = list(manifest['timestamp'].dt.to_pydatetime())
+            self._sorted_paths[currency] = list(manifest['path'])
+        return self._sorted_ts[currency], self._sorted_paths[currency]
 
     def save_snapshot(self, snapshot, save_raw=False):
         """Save a snapshot to disk"""
 
-        # Save metadata as JSON
-        filename = f"{snapshot.currency}_{snapshot.timestamp.strftime('%Y%m%d_%H%M%S')}.json"
+        # Save scalars and metrics as a small JSON, surface meshes as .npy
+        stem = f"{snapshot.currency}_{snapshot.timestamp.strftime('%Y%m%d_%H%M%S')}"
+        filename = f"{stem}.json"
         filepath = self.storage_dir / filename
 
+        rows = [row for row in self._read_manifest_rows() if row['path'] != filename]
+
+        # Meshes share one shape, so stack them into a single memory-mappable array;
+        # float32 is ample for plotting and halves the bytes on disk and read back
+        np.save(self.storage_dir / f"{stem}_surface.npy",
+                np.stack(snapshot.surface_data, dtype=np.float32))
+
         with open(filepath, 'w') as f:
-            json.dump(snapshot.to_dict(), f, indent=2)
+            json.dump(snapshot.to_dict(include_surface=False), f, indent=2)
 
-        # Optionally save raw options data as pickle (larger files)
+        # Optionally save raw options data as gzip-compressed pickle (larger files)
         if save_raw and snapshot.raw_options is not None:
-            raw_filename = f"{snapshot.currency}_{snapshot.timestamp.strftime('%Y%m%d_%H%M%S')}_raw.pkl"
-            raw_filepath = self.storage_dir / raw_filename
-            snapshot.raw_options.to_pickle(raw_filepath)
+            raw_filepath = self.storage_dir / f"{stem}_raw.pkl.gz"
+            snapshot.raw_options.to_pickle(raw_filepath, compression='gzip')
+
+        # Update the manifest incrementally rather than rescanning the directory
+        rows.append(self._manifest_row(snapshot, filename))
+        self._write_manifest_rows(rows)
+        self._manifest = None
+
+        # Keep already-built search indexes sorted instead of rebuilding them
+        for key in (None, snapshot.currency):
+            if key in self._sorted_ts:
+                sorted_ts, sorted_paths = self._sorted_ts[key], self._sorted_paths[key]
+                path = str(filepath)
+                if path in sorted_paths:
+                    idx = sorted_paths.index(path)
+                    del sorted_ts[idx], sorted_paths[idx]
+                idx = bisect.bisect_right(sorted_ts, snapshot.timestamp)
+                sorted_ts.insert(idx, snapshot.timestamp)
+                sorted_paths.insert(idx, path)
 
         print(f"Snapshot saved: {filepath}")
 
     def load_snapshot(self, filepath):
-        """Load a snapshot from disk"""
+        """Load a snapshot's metadata from disk; surface and raw data load lazily"""
+        filepath = Path(filepath)
         with open(filepath, 'r') as f:
             data = json.load(f)
 
-        return SurfaceSnapshot.from_dict(data)
+        return SurfaceSnapshot.from_dict(
+            data,
+            surface_path=filepath.with_name(f"{filepath.stem}_surface.npy"),
+            raw_path=filepath.with_name(f"{filepath.stem}_raw.pkl.gz")
+        )
 
     def load_all_snapshots(self, currency=None):
         """Load all snapshots for a currency"""
-        snapshots = []
+        paths = [filepath for filepath in self._snapshot_files()
+                 if not currency or filepath.stem.startswith(currency)]
 
-        for filepath in sorted(self.storage_dir.glob('*.json')):
-            if currency and not filepath.stem.startswith(currency):
-                continue
-
-            snapshot = self.load_snapshot(filepath)
-            snapshots.append(snapshot)
+        # File reads are I/O-bound, so threads overlap them without pickling overhead
+        with ThreadPoolExecutor(max_workers=min(32, (os.cpu_count() or 1) * 4)) as executor:
+            snapshots = list(executor.map(self.load_snapshot, paths))
 
         self.snapshots = sorted(snapshots, key=lambda x: x.timestamp)
         print(f"Loaded {len(self.snapshots)} snapshots")
         return self.snapshots
 
-    def get_snapshot_by_date(self, target_date):
+    def get_snapshot_by_date(self, target_date, currency=None):
         """Get snapshot closest to a specific date"""
-        if not self.snapshots:
+        sorted_ts, sorted_paths = self._sorted_index(currency)
+        if not sorted_ts:
             return None
 
-        closest = min(self.snapshots,
-                     key=lambda x: abs((x.timestamp - target_date).total_seconds()))
-        return closest
+        # Closest snapshot is one of the two neighbours of the insertion point
+        idx = bisect.bisect_left(sorted_ts, target_date)
+        candidates = [i for i in (idx - 1, idx) if 0 <= i < len(sorted_ts)]
+        closest = min(candidates,
+                      key=lambda i: abs((sorted_ts[i] - target_date).total_seconds()))
+        return self.load_snapshot(sorted_paths[closest])
+
+    def snapshots_in_range(self, start_date, end_date, currency=None):
+        """
+        Get manifest rows for snapshots with start_date <= timestamp <= end_date.
+
+        Only the manifest is read; use load_snapshot(row['path']) to load the
+        surface of the snapshots actually needed.
+        """
+        sorted_ts, _ = self._sorted_index(currency)
+        lo = bisect.bisect_left(sorted_ts, start_date)
+        hi = bisect.bisect_right(sorted_ts, end_date)
+        return self.get_manifest(currency=currency).iloc[lo:hi]
+
+    def load_raw_data(self, snapshot, columns=None):
+        """
+        Load raw options data from pickle file for a given snapshot.
 
-    def load_raw_data(self, snapshot):
-        """Load raw options data from pickle file for a given snapshot"""
-        raw_filename = f"{snapshot.currency}_{snapshot.timestamp.strftime('%Y%m%d_%H%M%S')}_raw.pkl"
-        raw_filepath = self.storage_dir / raw_filename
+        With `columns`, only those of them present in the file are kept.
+        """
+        raw_filename = f"{snapshot.currency}_{snapshot.timestamp.strftime('%Y%m%d_%H%M%S')}_raw.pkl.gz"
+        raw_filepath = _find_raw_file(self.storage_dir / raw_filename)
 
-        if raw_filepath.exists():
+        if raw_filepath is not None:
             print(f"Loading raw data from: {raw_filepath}")
             try:
-                snapshot.raw_options = pd.read_pickle(raw_filepath)
+                raw_options = pd.read_pickle(raw_filepath)
+                if columns is not None:
+                    raw_options = raw_options[[col for col in columns if col in raw_options.columns]]
+                snapshot.raw_options = raw_options
                 print("Raw data loaded successfully.")
             except Exception as e:
                 print(f"Error loading raw data: {e}")
                 snapshot.raw_options = None
         else:
-            print(f"Raw data file not found: {raw_filepath}")
+            print(f"Raw data file not found: {self.storage_dir / raw_filename}")
             snapshot.raw_options = None
 
         return snapshot.raw_options
 
-    def get_metrics_timeseries(self):
-        """Extract time series of all metrics"""
-        if not self.snapshots:
-            return pd.DataFrame()
+    def get_metrics_timeseries(self, currency=None, bins=None, columns=None):
+        """
+        Extract time series of all metrics from the manifest (no snapshot files read).
 
-        data = []
-        for snap in self.snapshots:
-            row = {
-                'timestamp': snap.timestamp,
-                'underlying_price': snap.underlying_price,
-                'dvol': snap.dvol
-            }
-            row.update(snap.metrics)
-            data.append(row)
+        With `bins`, the series is M4-downsampled for plotting, keeping each bin's
+        first and last rows and the min and max rows of `columns` (default: all
+        numeric columns), i.e. at most 2 + 2 * len(columns) rows per bin.
+        """
+        manifest = self.get_manifest(currency=currency)
+        if manifest.empty:
+            return pd.DataFrame()
 
-        return pd.DataFrame(data).set_index('timestamp')
+        metrics = pd.json_normalize(manifest['metrics'].tolist())
+        df = pd.concat([manifest[['timestamp', 'underlying_price', 'dvol']], metrics], axis=1)
+        return _m4_downsample(df.set_index('timestamp'), bins, columns)
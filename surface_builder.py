@@ -6,15 +6,14 @@ import numpy as np
 from scipy.interpolate import griddata, RBFInterpolator
 from scipy.optimize import minimize
 
+# Above this many quotes the RBF fit switches from one global thin-plate solve
+# (O(N^3)) to local solves over each grid point's nearest RBF_NEIGHBORS quotes
+RBF_GLOBAL_MAX_POINTS = 2000
+RBF_NEIGHBORS = 50
 
-def create_simple_surface(df, method='cubic', grid_size=50):
-    """Create surface using scipy griddata"""
-
-    # Create points and values for interpolation
-    points = df[['log_moneyness', 'tte_years']].values
-    values = df['mark_iv'].values
 
-    # Create regular grid
+def _regular_mesh(df, grid_size):
+    """(log-moneyness, tte) meshgrid spanning the quotes, grid_size nodes per axis"""
     log_moneyness_grid = np.linspace(
         df['log_moneyness'].min(),
         df['log_moneyness'].max(),
@@ -26,7 +25,18 @@ def create_simple_surface(df, method='cubic', grid_size=50):
         grid_size
     )
 
-    log_moneyness_mesh, tte_mesh = np.meshgrid(log_moneyness_grid, tte_grid)
+    return np.meshgrid(log_moneyness_grid, tte_grid)
+
+
+def create_simple_surface(df, method='cubic', grid_size=50):
+    """Create surface using scipy griddata"""
+
+    # Create points and values for interpolation
+    points = df[['log_moneyness', 'tte_years']].values
+    values = df['mark_iv'].values
+
+    # Create regular grid
+    log_moneyness_mesh, tte_mesh = _regular_mesh(df, grid_size)
 
     # Interpolate
     iv_surface = griddata(
@@ -36,7 +46,7 @@ def create_simple_surface(df, method='cubic', grid_size=50):
         method=method
     )
 
-    return log_moneyness_mesh, tte_mesh, iv_surface
+    return log_moneyness_mesh, tte_mesh, iv_surface.astype(np.float32, copy=False)
 
 
 def create_rbf_surface(df, grid_size=50):
@@ -45,22 +55,12 @@ def create_rbf_surface(df, grid_size=50):
     points = df[['log_moneyness', 'tte_years']].values
     values = df['mark_iv'].values
 
-    # Create RBF interpolator
-    rbf = RBFInterpolator(points, values, kernel='thin_plate_spline')
+    # Create RBF interpolator (local k-NN solves only pay off on large chains)
+    neighbors = RBF_NEIGHBORS if len(points) > RBF_GLOBAL_MAX_POINTS else None
+    rbf = RBFInterpolator(points, values, kernel='thin_plate_spline', neighbors=neighbors)
 
     # Create grid
-    log_moneyness_grid = np.linspace(
-        df['log_moneyness'].min(),
-        df['log_moneyness'].max(),
-        grid_size
-    )
-    tte_grid = np.linspace(
-        df['tte_years'].min(),
-        df['tte_years'].max(),
-        grid_size
-    )
-
-    log_moneyness_mesh, tte_mesh = np.meshgrid(log_moneyness_grid, tte_grid)
+    log_moneyness_mesh, tte_mesh = _regular_mesh(df, grid_size)
     grid_points = np.column_stack([
         log_moneyness_mesh.ravel(),
         tte_mesh.ravel()
@@ -69,7 +69,7 @@ def create_rbf_surface(df, grid_size=50):
     # Interpolate
     iv_surface = rbf(grid_points).reshape(log_moneyness_mesh.shape)
 
-    return log_moneyness_mesh, tte_mesh, iv_surface
+    return log_moneyness_mesh, tte_mesh, iv_surface.astype(np.float32, copy=False)
 
 
 def svi_parametrization(k, a, b, rho, m, sigma):
@@ -81,58 +81,90 @@ def svi_parametrization(k, a, b, rho, m, sigma):
     return a + b * (rho * (k - m) + np.sqrt((k - m)**2 + sigma**2))
 
 
-def fit_svi_slice(strikes_log, ivs, tte):
-    """Fit SVI to a single expiration slice"""
+def fit_svi_slice(strikes_log, ivs, tte, x0=None):
+    """
+    Fit SVI to a single expiration slice.
+
+    x0 optionally warm-starts the fit from (a, b, rho, m, sigma), typically the
+    neighbouring expiry's fit; if that fit fails it is retried from the default.
+    """
+
+    # Contiguous float64 inputs, converted once per slice rather than per evaluation
+    strikes_log = np.ascontiguousarray(strikes_log, dtype=np.float64)
+    ivs = np.ascontiguousarray(ivs, dtype=np.float64)
 
     # Total variance = IV^2 * T
     total_var = (ivs ** 2) * tte
 
+    mean_total_var = total_var.sum() / len(total_var)
+
+    def optimal_a(phi, b):
+        # 'a' enters linearly: for fixed (b, rho, m, sigma) the best a >= 0 is
+        # the clipped mean residual, so it never has to be searched for
+        return max(mean_total_var - b * phi.sum() / len(phi), 0.0)
+
     def objective(params):
-        a, b, rho, m, sigma = params
-        predicted_var = svi_parametrization(strikes_log, a, b, rho, m, sigma)
-        return np.sum((total_var - predicted_var) ** 2)
-
-    # Initial guess
-    x0 = [
-        np.mean(total_var),
-        0.1,
-        0.0,
-        0.0,
-        0.1
-    ]
+        # Value and analytic gradient over (b, rho, m, sigma) in one pass, with
+        # (k - m), the square root and the residual built once and shared.
+        # At the optimal a the gradient is that of the full 5-parameter fit
+        b, rho, m, sigma = params
+        d = strikes_log - m
+        root = np.sqrt(d * d + sigma * sigma)
+        phi = rho * d + root
+        residual = total_var - (optimal_a(phi, b) + b * phi)
+
+        b_residual = b * residual
+        gradient = -2 * np.array([
+            residual @ phi,
+            b_residual @ d,
+            -(rho * b_residual.sum() + b_residual @ (d / root)),
+            sigma * (b_residual @ (1 / root))
+        ])
+        return residual @ residual, gradient
+
+    # Initial guess for (b, rho, m, sigma)
+    default_x0 = [0.1, 0.0, 0.0, 0.1]
 
     # Constraints
     bounds = [
-        (0, None),
         (0, None),
         (-1, 1),
         (None, None),
         (0.01, None)
     ]
 
-    result = minimize(objective, x0, bounds=bounds, method='L-BFGS-B')
+    if x0 is not None:
+        result = minimize(objective, x0[1:], jac=True, bounds=bounds, method='L-BFGS-B')
+    if x0 is None or not result.success:
+        result = minimize(objective, default_x0, jac=True, bounds=bounds, method='L-BFGS-B')
 
-    return result.x
+    b, rho, m, sigma = result.x
+    d = strikes_log - m
+    a = optimal_a(rho * d + np.sqrt(d * d + sigma * sigma), b)
+
+    return np.array([a, b, rho, m, sigma])
 
 
 def create_svi_surface(df, grid_size=50):
     """Create surface by fitting SVI to each expiration"""
 
-    expirations = df['tte_years'].unique()
     svi_params = {}
 
     print("\nFitting SVI model to each expiration slice...")
 
-    for tte in sorted(expirations):
-        slice_df = df[df['tte_years'] == tte]
-
+    # Split the chain into expiry slices in one pass instead of one mask per expiry.
+    # SVI parameters move smoothly across maturities, so each slice's fit is
+    # warm-started from the previous (shorter) expiry's
+    params = None
+    for tte, slice_df in df.groupby('tte_years', sort=True):
         if len(slice_df) < 5:
             continue
 
         params = fit_svi_slice(
-            slice_df['log_moneyness'].values,
-            slice_df['mark_iv'].values,
-            tte
+            slice_df['log_moneyness'].to_numpy(),
+            slice_df['mark_iv'].to_numpy(),
+            tte,
+            x0=params
         )
         svi_params[tte] = params
 
@@ -147,11 +179,10 @@ def create_svi_surface(df, grid_size=50):
     tte_grid = sorted(svi_params.keys())
 
     log_moneyness_mesh, tte_mesh = np.meshgrid(log_moneyness_grid, tte_grid)
-    iv_surface = np.zeros_like(log_moneyness_mesh)
 
-    for i, tte in enumerate(tte_grid):
-        params = svi_params[tte]
-        total_var = svi_parametrization(log_moneyness_grid, *params)
-        iv_surface[i, :] = np.sqrt(total_var / tte)
+    # Every slice at once: each parameter as a column broadcast against the grid
+    params = np.array([svi_params[tte] for tte in tte_grid]).reshape(-1, 5)
+    total_var = svi_parametrization(log_moneyness_grid, *params.T[:, :, np.newaxis])
+    iv_surface = np.sqrt(total_var / tte_mesh)
 
-    return log_moneyness_mesh, tte_mesh, iv_surface, svi_params
+    return log_moneyness_mesh, tte_mesh, iv_surface.astype(np.float32, copy=False), svi_params
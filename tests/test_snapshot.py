@@ -0,0 +1,41 @@
+"""
+Tests for snapshot storage and the snapshot manifest.
+
+Run from the repository root with: python -m pytest tests
+"""
+
+from datetime import datetime
+
+import numpy as np
+
+from snapshot import SurfaceSnapshot, SurfaceHistory
+
+
+def make_snapshot(timestamp):
+    """Minimal snapshot with a small flat surface"""
+    mesh = np.zeros((2, 3))
+    return SurfaceSnapshot(
+        timestamp=timestamp,
+        currency='BTC',
+        underlying_price=50000.0,
+        dvol=50.0,
+        surface_data=(mesh, mesh, mesh),
+        raw_options=None,
+        metrics={}
+    )
+
+
+def test_manifest_parses_mixed_precision_timestamps(tmp_path):
+    # isoformat() writes no fraction for whole seconds and six digits otherwise
+    whole = datetime(2024, 1, 1, 12, 0, 0)
+    fractional = datetime(2024, 1, 2, 12, 0, 0, 123456)
+
+    history = SurfaceHistory(storage_dir=tmp_path)
+    history.save_snapshot(make_snapshot(fractional))
+    history.save_snapshot(make_snapshot(whole))
+
+    manifest = SurfaceHistory(storage_dir=tmp_path).get_manifest()
+    assert list(manifest['timestamp']) == [whole, fractional]
+
+    snapshot = SurfaceHistory(storage_dir=tmp_path).get_snapshot_by_date(fractional)
+    assert snapshot.timestamp == fractional
@@ -10,40 +10,84 @@ from datetime import timedelta
 
 plt.style.use('seaborn-v0_8-darkgrid')
 
+# Metrics drawn by plot_metrics_timeseries; long histories are downsampled on these
+METRICS_PLOT_COLUMNS = ['atm_iv_7d', 'atm_iv_30d', 'atm_iv_90d', 'atm_iv_180d', 'dvol',
+                        'skew_25d', 'term_structure_slope', 'underlying_price', 'iv_std']
+
+
+def _surface_arrays(*meshes):
+    """
+    C-contiguous float32 copies of the meshes for plot_surface.
+
+    Together with rstride=cstride=1 this keeps matplotlib on its vectorized
+    polygon path instead of building a Python list of patches.
+    """
+    return [np.ascontiguousarray(mesh, dtype=np.float32) for mesh in meshes]
+
+
+def _save_figure(fig, save_path):
+    """
+    Save fig and release it from pyplot, so batch exports don't accumulate
+    open figures; the returned Figure can still be saved again.
+    """
+    fig.savefig(save_path, dpi=150, bbox_inches='tight')
+    plt.close(fig)
+    print(f"Saved to {save_path}")
+
 
 def plot_volatility_surface(log_moneyness_mesh, tte_mesh, iv_surface,
                             underlying_price, title='Implied Volatility Surface',
-                            save_path=None):
-    """Plot 3D volatility surface"""
+                            save_path=None, existing=None):
+    """
+    Plot 3D volatility surface.
 
-    fig = plt.figure(figsize=(16, 10))
-    ax = fig.add_subplot(111, projection='3d')
+    Pass the (fig, ax) returned by a previous call as `existing` to redraw the
+    surface into that figure and its colorbar instead of allocating and laying
+    out a new one.
+    """
 
-    strike_mesh = underlying_price * np.exp(log_moneyness_mesh)
+    strike_mesh, days_mesh, iv_pct = _surface_arrays(
+        underlying_price * np.exp(log_moneyness_mesh), tte_mesh * 365, iv_surface * 100)
+
+    if existing is not None:
+        fig, ax = existing
+        old = ax.collections[0]
+        cbar = old.colorbar
+        old.remove()
+    else:
+        fig = plt.figure(figsize=(16, 10))
+        ax = fig.add_subplot(111, projection='3d')
 
     surf = ax.plot_surface(
         strike_mesh,
-        tte_mesh * 365,
-        iv_surface * 100,
+        days_mesh,
+        iv_pct,
+        rstride=1,
+        cstride=1,
         cmap='viridis',
         alpha=0.8,
         edgecolor='none'
     )
 
-    ax.set_xlabel('Strike Price ($)', fontsize=12, labelpad=10)
-    ax.set_ylabel('Days to Expiration', fontsize=12, labelpad=10)
-    ax.set_zlabel('Implied Volatility (%)', fontsize=12, labelpad=10)
-    ax.set_title(title, fontsize=16, fontweight='bold', pad=20)
+    if existing is not None:
+        # Point the existing colorbar at the new surface and its color limits
+        cbar.update_normal(surf)
+        surf.colorbar = cbar
+        ax.set_title(title, fontsize=16, fontweight='bold', pad=20)
+    else:
+        ax.set_xlabel('Strike Price ($)', fontsize=12, labelpad=10)
+        ax.set_ylabel('Days to Expiration', fontsize=12, labelpad=10)
+        ax.set_zlabel('Implied Volatility (%)', fontsize=12, labelpad=10)
+        ax.set_title(title, fontsize=16, fontweight='bold', pad=20)
 
-    fig.colorbar(surf, ax=ax, shrink=0.5, aspect=5, pad=0.1)
+        fig.colorbar(surf, ax=ax, shrink=0.5, aspect=5, pad=0.1)
 
-    ax.view_init(elev=25, azim=45)
+        ax.view_init(elev=25, azim=45)
 
-    plt.tight_layout()
+        plt.tight_layout()
 
     if save_path:
-        plt.savefig(save_path, dpi=150, bbox_inches='tight')
-        print(f"Saved to {save_path}")
+        _save_figure(fig, save_path)
     else:
         plt.show()
 
@@ -65,9 +109,15 @@ def plot_volatility_smile(df, expirations=None, save_path=None):
 
     colors = plt.cm.plasma(np.linspace(0, 0.9, len(expirations)))
 
+    # Sort by expiry once; each smile is then a binary-searched slice of rows
+    # within a day of its expiry rather than a scan and copy of the whole chain
+    by_tte = df.sort_values('tte_days')
+    tte_sorted = by_tte['tte_days'].to_numpy()
+
     for tte_days, color in zip(expirations, colors):
-        slice_df = df[np.abs(df['tte_days'] - tte_days) < 1].copy()
-        slice_df = slice_df.sort_values('moneyness')
+        start = np.searchsorted(tte_sorted, tte_days - 1, side='right')
+        stop = np.searchsorted(tte_sorted, tte_days + 1, side='left')
+        slice_df = by_tte.iloc[start:stop].sort_values('moneyness')
 
         ax.plot(
             slice_df['moneyness'],
@@ -89,8 +139,7 @@ def plot_volatility_smile(df, expirations=None, save_path=None):
     plt.tight_layout()
 
     if save_path:
-        plt.savefig(save_path, dpi=150, bbox_inches='tight')
-        print(f"Saved to {save_path}")
+        _save_figure(fig, save_path)
     else:
         plt.show()
 
@@ -135,21 +184,34 @@ def plot_term_structure(df, moneyness_levels=[0.9, 1.0, 1.1], save_path=None):
     plt.tight_layout()
 
     if save_path:
-        plt.savefig(save_path, dpi=150, bbox_inches='tight')
-        print(f"Saved to {save_path}")
+        _save_figure(fig, save_path)
     else:
         plt.show()
 
     return fig, ax
 
 
-def plot_heatmap(log_moneyness_mesh, tte_mesh, iv_surface, underlying_price, save_path=None):
-    """Plot volatility surface as a heatmap"""
+def plot_heatmap(log_moneyness_mesh, tte_mesh, iv_surface, underlying_price, save_path=None,
+                 existing=None):
+    """
+    Plot volatility surface as a heatmap.
 
-    fig, ax = plt.subplots(figsize=(14, 8))
+    Pass the (fig, ax) returned by a previous call as `existing` to redraw the
+    contours into that figure and its colorbar axes without a new layout.
+    """
 
     strike_mesh = underlying_price * np.exp(log_moneyness_mesh)
 
+    if existing is not None:
+        fig, ax = existing
+        # The contour set is a single collection (matplotlib >= 3.8)
+        old = ax.collections[0]
+        cbar = old.colorbar
+        old.remove()
+        ax.ignore_existing_data_limits = True
+    else:
+        fig, ax = plt.subplots(figsize=(14, 8))
+
     c = ax.contourf(
         strike_mesh,
         tte_mesh * 365,
@@ -158,18 +220,23 @@ def plot_heatmap(log_moneyness_mesh, tte_mesh, iv_surface, underlying_price, sav
         cmap='RdYlGn_r'
     )
 
-    ax.set_xlabel('Strike Price ($)', fontsize=13)
-    ax.set_ylabel('Days to Expiration', fontsize=13)
-    ax.set_title('Implied Volatility Heatmap', fontsize=16, fontweight='bold')
+    if existing is not None:
+        # Contour levels are fixed when a colorbar is created, so redraw it in its own axes
+        cbar.ax.clear()
+        cbar = fig.colorbar(c, cax=cbar.ax)
+        cbar.set_label('Implied Volatility (%)', fontsize=12)
+    else:
+        ax.set_xlabel('Strike Price ($)', fontsize=13)
+        ax.set_ylabel('Days to Expiration', fontsize=13)
+        ax.set_title('Implied Volatility Heatmap', fontsize=16, fontweight='bold')
 
-    cbar = fig.colorbar(c, ax=ax)
-    cbar.set_label('Implied Volatility (%)', fontsize=12)
+        cbar = fig.colorbar(c, ax=ax)
+        cbar.set_label('Implied Volatility (%)', fontsize=12)
 
-    plt.tight_layout()
+        plt.tight_layout()
 
     if save_path:
-        plt.savefig(save_path, dpi=150, bbox_inches='tight')
-        print(f"Saved to {save_path}")
+        _save_figure(fig, save_path)
     else:
         plt.show()
 
@@ -184,9 +251,10 @@ def plot_surface_comparison(snapshot1, snapshot2, title1='Surface 1', title2='Su
     # First surface
     ax1 = fig.add_subplot(121, projection='3d')
     log_m1, tte1, iv1 = snapshot1.surface_data
-    strike1 = snapshot1.underlying_price * np.exp(log_m1)
+    strike1, days1, iv_pct1 = _surface_arrays(
+        snapshot1.underlying_price * np.exp(log_m1), tte1 * 365, iv1 * 100)
 
-    surf1 = ax1.plot_surface(strike1, tte1 * 365, iv1 * 100,
+    surf1 = ax1.plot_surface(strike1, days1, iv_pct1, rstride=1, cstride=1,
                              cmap='viridis', alpha=0.8, edgecolor='none')
     ax1.set_xlabel('Strike ($)', fontsize=11)
     ax1.set_ylabel('Days to Exp', fontsize=11)
@@ -198,9 +266,10 @@ def plot_surface_comparison(snapshot1, snapshot2, title1='Surface 1', title2='Su
     # Second surface
     ax2 = fig.add_subplot(122, projection='3d')
     log_m2, tte2, iv2 = snapshot2.surface_data
-    strike2 = snapshot2.underlying_price * np.exp(log_m2)
+    strike2, days2, iv_pct2 = _surface_arrays(
+        snapshot2.underlying_price * np.exp(log_m2), tte2 * 365, iv2 * 100)
 
-    surf2 = ax2.plot_surface(strike2, tte2 * 365, iv2 * 100,
+    surf2 = ax2.plot_surface(strike2, days2, iv_pct2, rstride=1, cstride=1,
                              cmap='viridis', alpha=0.8, edgecolor='none')
     ax2.set_xlabel('Strike ($)', fontsize=11)
     ax2.set_ylabel('Days to Exp', fontsize=11)
@@ -212,8 +281,7 @@ def plot_surface_comparison(snapshot1, snapshot2, title1='Surface 1', title2='Su
     plt.tight_layout()
 
     if save_path:
-        plt.savefig(save_path, dpi=150, bbox_inches='tight')
-        print(f"Saved to {save_path}")
+        _save_figure(fig, save_path)
     else:
         plt.show()
 
@@ -236,9 +304,8 @@ def plot_difference_surface(snapshot1, snapshot2, title='IV Change', save_path=N
         fill_value=None
     )
 
-    # Create mesh from snapshot2
-    points = np.array([tte2.ravel(), log_m2.ravel()]).T
-    iv1_interp = interp1(points).reshape(iv2.shape)
+    # Evaluate on snapshot2's mesh directly, without stacking an (N, 2) point array
+    iv1_interp = interp1((tte2, log_m2))
 
     # Calculate difference
     iv_diff = (iv2 - iv1_interp) * 100  # Convert to percentage points
@@ -246,10 +313,11 @@ def plot_difference_surface(snapshot1, snapshot2, title='IV Change', save_path=N
     fig = plt.figure(figsize=(16, 10))
     ax = fig.add_subplot(111, projection='3d')
 
-    strike2 = snapshot2.underlying_price * np.exp(log_m2)
+    strike2, days2, iv_diff_plot = _surface_arrays(
+        snapshot2.underlying_price * np.exp(log_m2), tte2 * 365, iv_diff)
 
     # Use diverging colormap
-    surf = ax.plot_surface(strike2, tte2 * 365, iv_diff,
+    surf = ax.plot_surface(strike2, days2, iv_diff_plot, rstride=1, cstride=1,
                           cmap='RdBu_r', alpha=0.8, edgecolor='none',
                           vmin=-np.nanpercentile(np.abs(iv_diff), 95),
                           vmax=np.nanpercentile(np.abs(iv_diff), 95))
@@ -266,18 +334,28 @@ def plot_difference_surface(snapshot1, snapshot2, title='IV Change', save_path=N
     plt.tight_layout()
 
     if save_path:
-        plt.savefig(save_path, dpi=150, bbox_inches='tight')
-        print(f"Saved to {save_path}")
+        _save_figure(fig, save_path)
     else:
         plt.show()
 
     return fig
 
 
-def plot_metrics_timeseries(history, save_path=None):
-    """Plot time series of key volatility metrics"""
+def plot_metrics_timeseries(history, save_path=None, currency=None, bins=1200):
+    """
+    Plot time series of key volatility metrics.
 
-    df = history.get_metrics_timeseries()
+    `history` is a SurfaceHistory, or a DataFrame already returned by
+    SurfaceHistory.get_metrics_timeseries(). Long histories are M4-downsampled
+    on METRICS_PLOT_COLUMNS to `bins` time bins (roughly the rendered width in
+    pixels) before plotting.
+    """
+
+    if hasattr(history, 'get_metrics_timeseries'):
+        df = history.get_metrics_timeseries(currency=currency, bins=bins,
+                                            columns=METRICS_PLOT_COLUMNS)
+    else:
+        df = history
 
     if len(df) == 0:
         print("No data to plot")
@@ -342,8 +420,7 @@ def plot_metrics_timeseries(history, save_path=None):
     plt.tight_layout()
 
     if save_path:
-        plt.savefig(save_path, dpi=150, bbox_inches='tight')
-        print(f"Saved to {save_path}")
+        _save_figure(fig, save_path)
     else:
         plt.show()
 
@@ -410,12 +487,15 @@ def plot_greeks_surface_3d(df, underlying_price, greek='delta', save_path=None,
     fig = plt.figure(figsize=(16, 10))
     ax = fig.add_subplot(111, projection='3d')
 
-    strike_mesh = underlying_price * np.exp(log_moneyness_mesh)
+    strike_mesh, days_mesh, greek_surface = _surface_arrays(
+        underlying_price * np.exp(log_moneyness_mesh), tte_mesh * 365, greek_surface)
 
     surf = ax.plot_surface(
         strike_mesh,
-        tte_mesh * 365,
+        days_mesh,
         greek_surface,
+        rstride=1,
+        cstride=1,
         cmap='viridis',
         alpha=0.8,
         edgecolor='none'
@@ -432,8 +512,7 @@ def plot_greeks_surface_3d(df, underlying_price, greek='delta', save_path=None,
     plt.tight_layout()
 
     if save_path:
-        plt.savefig(save_path, dpi=150, bbox_inches='tight')
-        print(f"Saved to {save_path}")
+        _save_figure(fig, save_path)
     else:
         plt.show()
 